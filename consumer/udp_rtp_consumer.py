@@ -14,12 +14,22 @@ import time
 import logging
 import sys
 import os
-import base64
+import struct
 import requests
+import queue
 from collections import deque
 
+# Optional: PyTurboJPEG calls libjpeg-turbo directly (faster than cv2.imencode)
+try:
+    from turbojpeg import TurboJPEG, TJPF_GRAY, TJSAMP_GRAY
+    turbo_jpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except Exception:
+    TURBOJPEG_AVAILABLE = False
+
 gi.require_version("Gst", "1.0")
-from gi.repository import Gst, GLib
+gi.require_version("GstVideo", "1.0")
+from gi.repository import Gst, GstVideo, GLib
 
 # Initialize GStreamer
 Gst.init(None)
@@ -28,11 +38,43 @@ Gst.init(None)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+JPEG_QUALITY = 95
+
+# vjepa2-service /api/v1/infer/raw frame header: little-endian uint32 JPEG length
+FRAME_HEADER = struct.Struct("<I")
+
+def encode_jpeg(frame):
+    """JPEG-encode a GRAY8 frame, via libjpeg-turbo when PyTurboJPEG is installed"""
+    if TURBOJPEG_AVAILABLE:
+        # TurboJPEG needs contiguous rows; a no-op unless the stride is padded
+        return turbo_jpeg.encode(np.ascontiguousarray(frame), quality=JPEG_QUALITY, pixel_format=TJPF_GRAY,
+                                 jpeg_subsample=TJSAMP_GRAY)
+    success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return buffer if success else None
+
+class MappedFrame:
+    """GRAY8 view into a mapped Gst.Buffer; the sample stays mapped until release()"""
+    def __init__(self, sample, buf, map_info, array):
+        self.sample = sample
+        self.buf = buf
+        self.map_info = map_info
+        self.array = array
+    
+    def release(self):
+        if self.buf is not None:
+            self.array = None
+            self.buf.unmap(self.map_info)
+            self.buf = self.map_info = self.sample = None
+
 class UDPRTPConsumer:
     def __init__(self, url, vjepa_service_url=None):
         self.url = url
-        self.frame = None
-        self.lock = threading.Lock()
+        # Mapped frames from appsink, handed to the processing thread without a
+        # lock: deque append/pop are atomic, and whichever thread removes a
+        # frame releases it. Normally holds at most one frame (drop-oldest).
+        self.frames = deque()
+        self.frame_ready = threading.Event()
+        self.processing_thread = None
         self.pipeline = None
         self.loop = None
         self.running = False
@@ -48,10 +90,24 @@ class UDPRTPConsumer:
             'VJEPA_SERVICE_URL', 
             'http://localhost:8000'
         )
-        self.frame_buffer = deque(maxlen=16)  # Store 16 frames for VJEPA2 (frames_per_clip)
+        # Last 16 frames for VJEPA2 (frames_per_clip), each JPEG-encoded and
+        # length-prefixed once
+        self.frame_buffer = deque(maxlen=16)
+        self.frame_size = None  # (width, height) of buffered frames
         self.frames_per_clip = 16
         self.clips_sent = 0
         
+        # One sender thread with a keep-alive HTTP session; only the newest
+        # pending clip is kept
+        self.http = requests.Session()
+        self.pending_clip = None
+        self.clip_ready = threading.Event()
+        self.clip_sender_thread = None
+        
+        # Console output is written by a background thread (see write_console)
+        self.console_queue = queue.Queue(maxsize=64)
+        self.console_thread = None
+        
     def on_new_sample(self, sink):
         """Callback function for new video samples from GStreamer"""
         sample = sink.emit("pull-sample")
@@ -64,27 +120,64 @@ class UDPRTPConsumer:
         width = caps.get_structure(0).get_value("width")
         height = caps.get_structure(0).get_value("height")
 
+        # Plane layout: from the buffer's video meta when the producer attached
+        # one (e.g. nvvideoconvert padding), else the default for the caps
+        meta = GstVideo.buffer_get_video_meta(buf)
+        if meta:
+            stride, offset = meta.stride[0], meta.offset[0]
+        else:
+            info = GstVideo.VideoInfo.new_from_caps(caps)
+            stride, offset = info.stride[0], info.offset[0]
+
         success, map_info = buf.map(Gst.MapFlags.READ)
         if not success:
             return Gst.FlowReturn.ERROR
 
-        # Convert to numpy array
-        frame = np.ndarray(
-            (height, width, 3),
-            buffer=map_info.data,
-            dtype=np.uint8,
-        )
-        buf.unmap(map_info)
+        # Zero-copy view into the mapped buffer; the sample stays mapped until
+        # the processing thread is done with it (the clip buffer keeps only JPEGs)
+        frame = np.ndarray((height, width), dtype=np.uint8, buffer=map_info.data,
+                           offset=offset, strides=(stride, 1))
+        mapped = MappedFrame(sample, buf, map_info, frame)
 
-        # Store frame for processing
-        with self.lock:
-            self.frame = frame.copy()
-            
-        # Process frame with DeepStream-style analysis
-        self.process_frame(frame)
+        # Publish for the processing thread; an unprocessed older frame is dropped
+        self.frames.append(mapped)
+        while len(self.frames) > 1:
+            try:
+                self.frames.popleft().release()
+            except IndexError:
+                break
+        self.frame_ready.set()
             
         return Gst.FlowReturn.OK
     
+    def processing_loop(self):
+        """Run process_frame on the latest frame, off the GStreamer streaming thread"""
+        while self.running:
+            if not self.frame_ready.wait(timeout=0.5):
+                continue
+            self.frame_ready.clear()
+            try:
+                mapped = self.frames.pop()
+            except IndexError:
+                continue
+            self.release_frames()
+            
+            # Process frame with DeepStream-style analysis
+            try:
+                self.process_frame(mapped.array)
+            except Exception as e:
+                logger.error(f"Error processing frame: {e}", exc_info=True)
+            finally:
+                mapped.release()
+    
+    def release_frames(self):
+        """Release any frames still queued (older than the one being processed)"""
+        while True:
+            try:
+                self.frames.popleft().release()
+            except IndexError:
+                break
+    
     def process_frame(self, frame):
         """Process frame and print statistics"""
         self.frame_count += 1
@@ -94,131 +187,151 @@ class UDPRTPConsumer:
         if self.start_time is None:
             self.start_time = time.time()
         
-        # Add frame to buffer for VJEPA2 inference
-        self.frame_buffer.append(frame.copy())
-        
-        # When buffer is full, send to VJEPA2 service
-        if len(self.frame_buffer) == self.frames_per_clip:
-            self.send_clip_to_vjepa()
-        
-        # Convert to grayscale for analysis
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Calculate frame statistics
-        mean_intensity = float(np.mean(gray))
-        std_intensity = float(np.std(gray))
-        min_intensity = float(np.min(gray))
-        max_intensity = float(np.max(gray))
+        # Encode once on arrival; the sliding clip window reuses each frame's
+        # JPEG for every clip it appears in
+        jpeg = encode_jpeg(frame)
+        if jpeg is not None:
+            jpeg = bytes(jpeg)
+            self.frame_buffer.append(FRAME_HEADER.pack(len(jpeg)) + jpeg)
+            self.frame_size = (frame.shape[1], frame.shape[0])
+            
+            # When buffer is full, send to VJEPA2 service
+            if len(self.frame_buffer) == self.frames_per_clip:
+                self.send_clip_to_vjepa()
+        else:
+            logger.warning("Failed to encode frame to JPEG")
         
         # Show stats every 30 frames (~1 second at 30fps)
         if self.frame_count % 30 == 0:
+            # 2x decimated: fused mean/std and min/max in OpenCV
+            small = cv2.resize(frame, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+            mean, std = cv2.meanStdDev(small)
+            min_intensity, max_intensity, _, _ = cv2.minMaxLoc(small)
+            mean_intensity = float(mean[0, 0])
+            std_intensity = float(std[0, 0])
+            
             elapsed = time.time() - self.start_time
             fps = self.frame_count / elapsed if elapsed > 0 else 0
             
             # Print inline update (like producer)
-            sys.stdout.write(f"\r🧠 Frame #{self.frame_count:06d} | "
+            self.write_console(f"\r🧠 Frame #{self.frame_count:06d} | "
                            f"Size: {frame.shape[1]}x{frame.shape[0]} | "
                            f"FPS: {fps:5.1f} | "
                            f"Intensity: μ={mean_intensity:.2f} σ={std_intensity:.2f} "
                            f"[{min_intensity:.0f}-{max_intensity:.0f}] | "
                            f"Clips: {self.clips_sent}")
+    
+    def write_console(self, text):
+        """Queue text for the console thread; dropped if the console can't keep up"""
+        try:
+            self.console_queue.put_nowait(text)
+        except queue.Full:
+            pass
+    
+    def console_loop(self):
+        """Write queued console text in one write + flush per wakeup"""
+        while self.running or not self.console_queue.empty():
+            try:
+                lines = [self.console_queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    lines.append(self.console_queue.get_nowait())
+                except queue.Empty:
+                    break
+            sys.stdout.write("".join(lines))
             sys.stdout.flush()
     
     def send_clip_to_vjepa(self):
-        """Send batched clip to vjepa2-service (non-blocking)"""
+        """Hand the current clip to the sender thread (non-blocking)"""
         if not self.vjepa_service_url:
             return
         
-        # Copy frames from buffer (in case buffer is modified during encoding)
-        frames_to_send = list(self.frame_buffer)
-        
-        def send_async():
-            """Send clip in background thread to avoid blocking pipeline"""
+        # Snapshot the encoded frames (the buffer keeps sliding while we send).
+        # A clip the sender hasn't picked up yet is replaced by this newer one.
+        self.pending_clip = (list(self.frame_buffer), self.frame_size)
+        self.clip_ready.set()
+    
+    def clip_sender_loop(self):
+        """Send clips to vjepa2-service one at a time, always the most recent"""
+        while self.running:
+            if not self.clip_ready.wait(timeout=0.5):
+                continue
+            self.clip_ready.clear()
+            frames, (width, height) = self.pending_clip
+            self.post_clip(frames, width, height)
+    
+    def post_clip(self, frames, width, height):
+        """POST one clip to vjepa2-service (runs on the sender thread)"""
+        try:
+            # Quick health check first (non-blocking)
             try:
-                # Quick health check first (non-blocking)
+                health_response = self.http.get(
+                    f"{self.vjepa_service_url}/health",
+                    timeout=2.0
+                )
+                if health_response.status_code == 200:
+                    health_data = health_response.json()
+                    if not health_data.get('model_loaded', False):
+                        # Model still loading, skip this request
+                        return
+            except requests.exceptions.RequestException:
+                # Service might not be ready yet, skip this request
+                return
+            
+            if len(frames) != self.frames_per_clip:
+                logger.warning(f"Expected {self.frames_per_clip} frames, got {len(frames)}")
+                return
+            body = b"".join(frames)
+            
+            # Send to service with retry logic
+            max_retries = 2
+            for attempt in range(max_retries):
                 try:
-                    health_response = requests.get(
-                        f"{self.vjepa_service_url}/health",
-                        timeout=2.0
+                    response = self.http.post(
+                        f"{self.vjepa_service_url}/api/v1/infer/raw",
+                        params={"width": width, "height": height},
+                        data=body,
+                        headers={"Content-Type": "application/octet-stream"},
+                        timeout=15.0
                     )
-                    if health_response.status_code == 200:
-                        health_data = health_response.json()
-                        if not health_data.get('model_loaded', False):
-                            # Model still loading, skip this request
-                            return
-                except requests.exceptions.RequestException:
-                    # Service might not be ready yet, skip this request
-                    return
-                
-                # Encode frames to base64 JPEG
-                frames_b64 = []
-                for frame in frames_to_send:
-                    # Encode frame as JPEG then base64
-                    success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-                    if not success:
-                        logger.warning("Failed to encode frame to JPEG")
-                        continue
-                    frame_b64 = base64.b64encode(buffer).decode('utf-8')
-                    frames_b64.append(frame_b64)
-                
-                if len(frames_b64) != self.frames_per_clip:
-                    logger.warning(f"Expected {self.frames_per_clip} frames, got {len(frames_b64)}")
-                    return
-                
-                # Send to service with retry logic
-                max_retries = 2
-                for attempt in range(max_retries):
-                    try:
-                        response = requests.post(
-                            f"{self.vjepa_service_url}/api/v1/infer",
-                            json={
-                                "frames": frames_b64,
-                                "width": frames_to_send[0].shape[1],
-                                "height": frames_to_send[0].shape[0],
-                                "format": "BGR"
-                            },
-                            timeout=15.0
-                        )
-                        
-                        if response.status_code == 200:
-                            results = response.json()
-                            predictions = results.get('predictions', [])
-                            if predictions:
-                                top_pred = predictions[0]
-                                logger.info(
-                                    f"VJEPA2 Prediction: {top_pred.get('label', 'unknown')} "
-                                    f"({top_pred.get('confidence', 0.0):.2f})"
-                                )
-                            self.clips_sent += 1
-                            break  # Success, exit retry loop
-                        elif response.status_code == 503:
-                            # Service not ready, skip retries
-                            return
-                        else:
-                            if attempt < max_retries - 1:
-                                time.sleep(0.5)  # Brief wait before retry
-                                continue
-                            logger.warning(
-                                f"VJEPA2 service returned status {response.status_code}: "
-                                f"{response.text[:200]}"
+                    
+                    if response.status_code == 200:
+                        results = response.json()
+                        predictions = results.get('predictions', [])
+                        if predictions:
+                            top_pred = predictions[0]
+                            logger.info(
+                                f"VJEPA2 Prediction: {top_pred.get('label', 'unknown')} "
+                                f"({top_pred.get('confidence', 0.0):.2f})"
                             )
-                            break
-                    except requests.exceptions.RequestException as e:
+                        self.clips_sent += 1
+                        break  # Success, exit retry loop
+                    elif response.status_code == 503:
+                        # Service not ready, skip retries
+                        return
+                    else:
                         if attempt < max_retries - 1:
                             time.sleep(0.5)  # Brief wait before retry
                             continue
-                        # Last attempt failed, log and give up
-                        # Only log if it's not a connection reset (service might be loading)
-                        if "Connection reset" not in str(e) and "Connection aborted" not in str(e):
-                            logger.warning(f"Failed to send clip to VJEPA2 service: {e}")
-                        return
-                    
-            except Exception as e:
-                logger.error(f"Error in send_clip_to_vjepa: {e}", exc_info=True)
-        
-        # Run in background thread to avoid blocking pipeline
-        thread = threading.Thread(target=send_async, daemon=True)
-        thread.start()
+                        logger.warning(
+                            f"VJEPA2 service returned status {response.status_code}: "
+                            f"{response.text[:200]}"
+                        )
+                        break
+                except requests.exceptions.RequestException as e:
+                    if attempt < max_retries - 1:
+                        time.sleep(0.5)  # Brief wait before retry
+                        continue
+                    # Last attempt failed, log and give up
+                    # Only log if it's not a connection reset (service might be loading)
+                    if "Connection reset" not in str(e) and "Connection aborted" not in str(e):
+                        logger.warning(f"Failed to send clip to VJEPA2 service: {e}")
+                    return
+                
+        except Exception as e:
+            logger.error(f"Error in post_clip: {e}", exc_info=True)
     
     def bus_call(self, bus, message, loop):
         """Handle GStreamer bus messages"""
@@ -255,6 +368,27 @@ class UDPRTPConsumer:
         
         return True
     
+    def on_demux_pad_added(self, demux, pad, h264parse):
+        """Link tsdemux's H.264 pad to the parser once the SRT stream starts"""
+        caps = pad.get_current_caps() or pad.query_caps(None)
+        if not caps.to_string().startswith('video/x-h264'):
+            return
+        sinkpad = h264parse.get_static_pad("sink")
+        if sinkpad.is_linked():
+            return
+        if pad.link(sinkpad) != Gst.PadLinkReturn.OK:
+            logger.error("Failed to link tsdemux → h264parse")
+        else:
+            logger.info("✓ Linked tsdemux H.264 pad")
+    
+    def select_decoder(self):
+        """Pick (decoder, converter) element names, preferring hardware NVDEC"""
+        if Gst.ElementFactory.find("nvv4l2decoder"):
+            for convert_name in ("nvvideoconvert", "nvvidconv"):
+                if Gst.ElementFactory.find(convert_name):
+                    return "nvv4l2decoder", convert_name
+        return "avdec_h264", "videoconvert"
+    
     def setup_gstreamer_pipeline(self):
         """Setup GStreamer pipeline for UDP consumption using proper Python API"""
         print("=" * 60)
@@ -262,8 +396,9 @@ class UDPRTPConsumer:
         print("=" * 60)
         
         # Parse URL for port
-        if self.url.startswith('udp://'):
-            url_parts = self.url[6:]  # Remove 'udp://'
+        use_srt = self.url.startswith('srt://')
+        if self.url.startswith('udp://') or use_srt:
+            url_parts = self.url[6:]  # Remove 'udp://' / 'srt://'
             if ':' in url_parts:
                 host, port_str = url_parts.split(':', 1)
                 port = int(port_str)
@@ -274,7 +409,7 @@ class UDPRTPConsumer:
             host = "127.0.0.1"
             port = 8554
         
-        logger.info(f"UDP connection: host={host}, port={port}")
+        logger.info(f"{'SRT' if use_srt else 'UDP'} connection: host={host}, port={port}")
         
         # Create Pipeline
         self.pipeline = Gst.Pipeline()
@@ -282,28 +417,51 @@ class UDPRTPConsumer:
             logger.error("Unable to create Pipeline")
             return False
         
-        # STEP 1: UDP source
-        print("Creating udpsrc")
-        source = Gst.ElementFactory.make("udpsrc", "source")
-        if not source:
-            logger.error("Unable to create udpsrc")
-            return False
-        source.set_property('port', port)
-        
-        # STEP 2: RTP caps filter
-        print("Creating capsfilter (RTP)")
-        caps_rtp = Gst.ElementFactory.make("capsfilter", "caps-rtp")
-        if not caps_rtp:
-            logger.error("Unable to create capsfilter")
-            return False
-        caps_rtp.set_property('caps', Gst.Caps.from_string("application/x-rtp,encoding-name=H264,payload=96"))
-        
-        # STEP 3: RTP H.264 depayloader
-        print("Creating rtph264depay")
-        rtpdepay = Gst.ElementFactory.make("rtph264depay", "rtpdepay")
-        if not rtpdepay:
-            logger.error("Unable to create rtph264depay")
-            return False
+        if use_srt:
+            # STEP 1: SRT source (listens for the producer's caller connection)
+            print("Creating srtsrc")
+            source = Gst.ElementFactory.make("srtsrc", "source")
+            if not source:
+                logger.error("Unable to create srtsrc")
+                return False
+            source.set_property('uri', f"srt://:{port}?mode=listener")
+            source.set_property('latency', 60)
+            
+            # STEP 2+3: MPEG-TS demuxer (H.264 pad appears once the stream starts)
+            print("Creating tsdemux")
+            tsdemux = Gst.ElementFactory.make("tsdemux", "demux")
+            if not tsdemux:
+                logger.error("Unable to create tsdemux")
+                return False
+            
+            source_chain = [source, tsdemux]
+        else:
+            # STEP 1: UDP source
+            print("Creating udpsrc")
+            source = Gst.ElementFactory.make("udpsrc", "source")
+            if not source:
+                logger.error("Unable to create udpsrc")
+                return False
+            source.set_property('port', port)
+            # 4MB socket receive buffer to match the producer's send buffer
+            source.set_property('buffer-size', 4 * 1024 * 1024)
+            
+            # STEP 2: RTP caps filter
+            print("Creating capsfilter (RTP)")
+            caps_rtp = Gst.ElementFactory.make("capsfilter", "caps-rtp")
+            if not caps_rtp:
+                logger.error("Unable to create capsfilter")
+                return False
+            caps_rtp.set_property('caps', Gst.Caps.from_string("application/x-rtp,encoding-name=H264,payload=96"))
+            
+            # STEP 3: RTP H.264 depayloader
+            print("Creating rtph264depay")
+            rtpdepay = Gst.ElementFactory.make("rtph264depay", "rtpdepay")
+            if not rtpdepay:
+                logger.error("Unable to create rtph264depay")
+                return False
+            
+            source_chain = [source, caps_rtp, rtpdepay]
         
         # STEP 4: H.264 parser
         print("Creating h264parse")
@@ -311,19 +469,23 @@ class UDPRTPConsumer:
         if not h264parse:
             logger.error("Unable to create h264parse")
             return False
-        
-        # STEP 5: H.264 decoder
-        print("Creating avdec_h264")
-        decoder = Gst.ElementFactory.make("avdec_h264", "decoder")
+        # Resend SPS/PPS with every IDR so the decoder can start mid-stream
+        h264parse.set_property('config-interval', -1)
+        
+        # STEP 5: H.264 decoder - NVDEC when the NVIDIA plugins are installed
+        # (nvvideoconvert on dGPU/DeepStream, nvvidconv on Jetson), else libav on CPU
+        decoder_name, convert_name = self.select_decoder()
+        print(f"Creating {decoder_name}")
+        decoder = Gst.ElementFactory.make(decoder_name, "decoder")
         if not decoder:
-            logger.error("Unable to create avdec_h264")
+            logger.error(f"Unable to create {decoder_name}")
             return False
         
         # STEP 6: Convert to GRAY8 (to match what producer sends)
-        print("Creating videoconvert (to grayscale)")
-        vidconv1 = Gst.ElementFactory.make("videoconvert", "conv-gray")
+        print(f"Creating {convert_name} (to grayscale)")
+        vidconv1 = Gst.ElementFactory.make(convert_name, "conv-gray")
         if not vidconv1:
-            logger.error("Unable to create videoconvert")
+            logger.error(f"Unable to create {convert_name}")
             return False
         
         # Grayscale caps
@@ -333,21 +495,7 @@ class UDPRTPConsumer:
             return False
         caps_gray.set_property('caps', Gst.Caps.from_string("video/x-raw,format=GRAY8"))
         
-        # STEP 7: Convert to BGR for processing
-        print("Creating videoconvert (to BGR)")
-        vidconv2 = Gst.ElementFactory.make("videoconvert", "conv-bgr")
-        if not vidconv2:
-            logger.error("Unable to create videoconvert")
-            return False
-        
-        # BGR caps
-        caps_bgr = Gst.ElementFactory.make("capsfilter", "caps-bgr")
-        if not caps_bgr:
-            logger.error("Unable to create capsfilter")
-            return False
-        caps_bgr.set_property('caps', Gst.Caps.from_string("video/x-raw,format=BGR"))
-        
-        # STEP 8: App sink
+        # STEP 7: App sink (receives single-channel GRAY8 frames)
         print("Creating appsink")
         sink = Gst.ElementFactory.make("appsink", "sink")
         if not sink:
@@ -357,29 +505,29 @@ class UDPRTPConsumer:
         sink.set_property('max-buffers', 1)
         sink.set_property('drop', True)
         sink.set_property('sync', False)
+        # Don't keep a reference to the last buffer (it would pin a pool buffer)
+        sink.set_property('enable-last-sample', False)
         
         # Add all elements to pipeline
         print("Adding elements to pipeline")
-        self.pipeline.add(source)
-        self.pipeline.add(caps_rtp)
-        self.pipeline.add(rtpdepay)
+        for element in source_chain:
+            self.pipeline.add(element)
         self.pipeline.add(h264parse)
         self.pipeline.add(decoder)
         self.pipeline.add(vidconv1)
         self.pipeline.add(caps_gray)
-        self.pipeline.add(vidconv2)
-        self.pipeline.add(caps_bgr)
         self.pipeline.add(sink)
         
         # Link all elements
         print("Linking elements")
-        if not source.link(caps_rtp):
-            logger.error("Failed to link source → caps_rtp")
-            return False
-        if not caps_rtp.link(rtpdepay):
-            logger.error("Failed to link caps_rtp → rtpdepay")
-            return False
-        if not rtpdepay.link(h264parse):
+        for upstream, downstream in zip(source_chain, source_chain[1:]):
+            if not upstream.link(downstream):
+                logger.error(f"Failed to link {upstream.get_name()} → {downstream.get_name()}")
+                return False
+        if use_srt:
+            # tsdemux src pads are dynamic
+            tsdemux.connect("pad-added", self.on_demux_pad_added, h264parse)
+        elif not rtpdepay.link(h264parse):
             logger.error("Failed to link rtpdepay → h264parse")
             return False
         if not h264parse.link(decoder):
@@ -391,24 +539,21 @@ class UDPRTPConsumer:
         if not vidconv1.link(caps_gray):
             logger.error("Failed to link vidconv1 → caps_gray")
             return False
-        if not caps_gray.link(vidconv2):
-            logger.error("Failed to link caps_gray → vidconv2")
-            return False
-        if not vidconv2.link(caps_bgr):
-            logger.error("Failed to link vidconv2 → caps_bgr")
-            return False
-        if not caps_bgr.link(sink):
-            logger.error("Failed to link caps_bgr → sink")
+        if not caps_gray.link(sink):
+            logger.error("Failed to link caps_gray → sink")
             return False
         
         print("=" * 60)
         print("Pipeline Ready!")
-        print(f"  1. UDP Source (port {port})")
-        print("  2. RTP H.264 Depayload")
-        print("  3. H.264 Parse & Decode")
+        if use_srt:
+            print(f"  1. SRT Source (listening on port {port})")
+            print("  2. MPEG-TS Demux")
+        else:
+            print(f"  1. UDP Source (port {port})")
+            print("  2. RTP H.264 Depayload")
+        print(f"  3. H.264 Parse & Decode ({decoder_name})")
         print("  4. Convert to GRAY8 (match producer)")
-        print("  5. Convert to BGR (for processing)")
-        print("  6. AppSink (for frame callback)")
+        print("  5. AppSink (for frame callback)")
         print("=" * 60)
         
         # Connect appsink callback
@@ -438,11 +583,19 @@ class UDPRTPConsumer:
             self.pipeline.set_state(Gst.State.PLAYING)
             self.running = True
             
+            # Frame processing runs on its own thread
+            self.processing_thread = threading.Thread(target=self.processing_loop, daemon=True)
+            self.processing_thread.start()
+            self.clip_sender_thread = threading.Thread(target=self.clip_sender_loop, daemon=True)
+            self.clip_sender_thread.start()
+            self.console_thread = threading.Thread(target=self.console_loop, daemon=True)
+            self.console_thread.start()
+            
             print("\n" + "=" * 60)
             print("🎥 CONSUMER RECEIVING FROM PRODUCER")
             print("=" * 60)
             print(f"Stream URL: {self.url}")
-            print("Format: Grayscale 240x240 → BGR for analysis")
+            print("Format: Grayscale 240x240 (GRAY8) for analysis")
             print("=" * 60)
             print("Press Ctrl+C to stop")
             print("=" * 60 + "\n")
@@ -467,6 +620,15 @@ class UDPRTPConsumer:
         if self.pipeline:
             self.pipeline.set_state(Gst.State.NULL)
         
+        if self.processing_thread:
+            self.processing_thread.join(timeout=2.0)
+        if self.clip_sender_thread:
+            self.clip_sender_thread.join(timeout=2.0)
+        if self.console_thread:
+            self.console_thread.join(timeout=2.0)
+        self.release_frames()
+        self.http.close()
+        
         # Print final stats
         if self.frame_count > 0 and self.start_time:
             elapsed = time.time() - self.start_time
@@ -509,9 +671,9 @@ def main():
         print("Set RTSP_URL environment variable")
         sys.exit(1)
     
-    if not (url.startswith('rtsp://') or url.startswith('udp://')):
+    if not (url.startswith('rtsp://') or url.startswith('udp://') or url.startswith('srt://')):
         print(f"❌ Invalid URL format: {url}")
-        print(f"❌ Expected format: rtsp://host:port/path or udp://host:port")
+        print(f"❌ Expected format: rtsp://host:port/path, udp://host:port or srt://host:port")
         sys.exit(1)
     
     print(f"✅ URL validation passed: {url}")
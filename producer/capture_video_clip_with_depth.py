@@ -42,8 +42,80 @@ import cv2
 import numpy as np
 from datetime import datetime
 import json
+
+# orjson serializes clip metadata (including numpy arrays) in C; stdlib json is the fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 import threading
-from queue import Queue
+import itertools
+from collections import deque
+from queue import Queue, Empty, Full
+
+# Memory budget for clips waiting in (or being written by) the background saver
+SAVE_QUEUE_MAX_BYTES = 128 * 1024 * 1024  # 128 MB
+
+# Background save threads - MP4 encoding releases the GIL, so two writers let
+# one clip encode while the previous one is still being flushed to disk
+SAVE_WORKERS = 2
+
+# Serializes appends to the run-level clips.ndjson across save workers
+_run_metadata_lock = threading.Lock()
+
+class ClipSaveQueue:
+    """Clip queue bounded by total bytes instead of clip count
+    
+    Items are put as (nbytes, clip) and their bytes stay reserved until the
+    consumer calls task_done(nbytes), so the clip being written still counts
+    against the budget. A clip larger than the whole budget is only accepted
+    when nothing else is pending, otherwise it could never be saved.
+    """
+    
+    def __init__(self, max_bytes=SAVE_QUEUE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+    
+    def put_nowait(self, nbytes, clip):
+        """Queue a clip, raising queue.Full if it would exceed the byte budget"""
+        with self._cond:
+            if self.total_bytes > 0 and self.total_bytes + nbytes > self.max_bytes:
+                raise Full
+            self.total_bytes += nbytes
+            self._items.append((nbytes, clip))
+            self._cond.notify_all()
+    
+    def get(self, timeout=None):
+        """Return the next (nbytes, clip), raising queue.Empty on timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout=timeout):
+                raise Empty
+            return self._items.popleft()
+    
+    def task_done(self, nbytes):
+        """Release the bytes of a clip once it has been saved"""
+        with self._cond:
+            self.total_bytes -= nbytes
+            self._cond.notify_all()
+    
+    def empty(self):
+        with self._cond:
+            return not self._items
+    
+    def join(self, timeout=None):
+        """Wait until every queued clip has been saved"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.total_bytes == 0, timeout=timeout)
+
+def clip_nbytes(color_frames, depth_frames):
+    """Approximate in-memory size of a captured clip"""
+    nbytes = sum(f.nbytes for f in color_frames)
+    if depth_frames is not None:
+        nbytes += sum(d.nbytes for d in depth_frames if d is not None)
+    return nbytes
 
 def find_camera():
     """Find working RGB color camera device - prioritize /dev/video4 (RGB)"""
@@ -91,8 +163,29 @@ def find_camera():
             pass
     return None
 
-def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
-    """Capture clip using RealSense SDK (gets both color and depth)"""
+def realsense_frame_view(frame, dtype):
+    """Zero-copy numpy view of a RealSense video frame buffer
+    
+    The view is only valid until the SDK recycles the frame, so copy it
+    before the next wait_for_frames().
+    """
+    channels = frame.get_bytes_per_pixel() // np.dtype(dtype).itemsize
+    shape = (frame.get_height(), frame.get_width())
+    if channels > 1:
+        shape += (channels,)
+    return np.frombuffer(frame.get_data(), dtype=dtype).reshape(shape)
+
+# Depth outside this range (meters) is zeroed inside librealsense, before
+# the frame reaches Python; set either bound to None to disable the filter
+DEPTH_MIN_M = 0.2
+DEPTH_MAX_M = 6.0
+
+def start_realsense_pipeline(fps=15, quick_test=False, depth_min_m=DEPTH_MIN_M, depth_max_m=DEPTH_MAX_M):
+    """Start a RealSense color + depth pipeline
+    
+    Returns (pipeline, align, depth_scale, depth_filters), or None if no device
+    could be started. depth_filters are applied to each frameset before alignment.
+    """
     # Create context and wait for backend
     ctx = rs.context()
     
@@ -118,7 +211,7 @@ def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
     if len(devices) == 0:
         if not quick_test:
             print("  ✗ No RealSense devices found after retries")
-        return None, None, None
+        return None
     
     # Create pipeline with context
     try:
@@ -196,7 +289,7 @@ def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
         except Exception as e:
             if quick_test:
                 # For quick test, fail immediately
-                return None, None, None
+                return None
             elif attempt < max_attempts - 1:
                 print(f"  Attempt {attempt + 1} failed: {str(e)[:50]}...")
                 time.sleep(0.5)  # Wait a bit longer between retries
@@ -205,10 +298,10 @@ def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
                 error_msg = str(e)
                 if "No device connected" in error_msg or "device" in error_msg.lower():
                     print(f"  ✗ RealSense SDK can't access device (known SDK bug)")
-                return None, None, None
+                return None
     
     if profile is None:
-        return None, None, None
+        return None
     
     # Get depth scale
     try:
@@ -221,9 +314,37 @@ def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
     # Alignment (align depth to color)
     align = rs.align(rs.stream.color)
     
-    # Capture frames
-    color_frames = []
-    depth_frames = []
+    # SDK-side depth filtering (runs in librealsense, not Python)
+    depth_filters = []
+    if depth_min_m is not None and depth_max_m is not None:
+        depth_filters.append(rs.threshold_filter(depth_min_m, depth_max_m))
+    
+    return pipeline, align, depth_scale, depth_filters
+
+def capture_clip_realsense(duration=3.0, fps=15, quick_test=False, session=None):
+    """Capture clip using RealSense SDK (gets both color and depth)
+    
+    session is the (pipeline, align, depth_scale, depth_filters) tuple from
+    start_realsense_pipeline.
+    When given, the pipeline is reused and left streaming so consecutive clips
+    are captured back to back; otherwise a pipeline is started and stopped for
+    this clip only.
+    
+    Depth frames are kept as raw uint16 sensor units; multiply by
+    depth_scale * 1000 to get millimeters.
+    Returns (color_frames, depth_frames, timestamps, depth_scale).
+    """
+    owns_pipeline = session is None
+    if owns_pipeline:
+        session = start_realsense_pipeline(fps, quick_test)
+        if session is None:
+            return None, None, None, None
+    pipeline, align, depth_scale, depth_filters = session
+    
+    # Capture frames into per-clip (T, H, W[, 3]) buffers, allocated once on the
+    # first frame and filled in place (one allocation per clip instead of per frame)
+    color_frames = None
+    depth_frames = None
     timestamps = []
     
     expected_frames = int(duration * fps)
@@ -235,6 +356,8 @@ def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
     while frame_count < expected_frames:
         try:
             frames = pipeline.wait_for_frames(timeout_ms=int(max_wait_time * 1000))
+            for depth_filter in depth_filters:
+                frames = depth_filter.process(frames).as_frameset()
             aligned = align.process(frames)
             
             depth_frame = aligned.get_depth_frame()
@@ -243,15 +366,19 @@ def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
             if not depth_frame or not color_frame:
                 continue
             
-            # Convert to numpy
-            depth_image = np.asanyarray(depth_frame.get_data())
-            color_image = np.asanyarray(color_frame.get_data())
+            # View the SDK buffers without copying - the copy into the clip
+            # buffer below is the only one per frame
+            depth_image = realsense_frame_view(depth_frame, np.uint16)
+            color_image = realsense_frame_view(color_frame, np.uint8)
             
-            # Depth to mm (uint16 depth values * scale * 1000 = mm)
-            depth_mm = (depth_image.astype(np.float32) * depth_scale * 1000.0)
+            if color_frames is None:
+                color_frames = np.empty((expected_frames,) + color_image.shape, dtype=color_image.dtype)
+                depth_frames = np.empty((expected_frames,) + depth_image.shape, dtype=depth_image.dtype)
             
-            color_frames.append(color_image.copy())
-            depth_frames.append(depth_mm.copy())
+            # Keep raw uint16 depth (half the memory of float32 mm) - it is
+            # scaled to mm only where the saved statistics need it
+            np.copyto(color_frames[frame_count], color_image)
+            np.copyto(depth_frames[frame_count], depth_image)
             timestamps.append(time.time())
             
             frame_count += 1
@@ -263,10 +390,18 @@ def capture_clip_realsense(duration=3.0, fps=15, quick_test=False):
             print(f"\n  ⚠️  Frame capture error: {str(e)[:50]}")
             break
     
-    pipeline.stop()
-    print(f"Done! ({len(color_frames)} frames)")
+    if owns_pipeline:
+        pipeline.stop()
+    print(f"Done! ({frame_count} frames)")
     
-    return color_frames, depth_frames, timestamps
+    if color_frames is None:
+        return [], None, timestamps, depth_scale
+    if frame_count < expected_frames:
+        # Copy a short clip out so the full preallocated buffers are freed
+        # (clip_nbytes and the save-queue budget count only what is returned)
+        return (color_frames[:frame_count].copy(), depth_frames[:frame_count].copy(),
+                timestamps, depth_scale)
+    return color_frames, depth_frames, timestamps, depth_scale
 
 def read_z16_depth_frame(device_path='/dev/video0', width=256, height=144):
     """Read raw Z16 depth frame from V4L2 device using v4l2-ctl"""
@@ -394,7 +529,8 @@ def capture_clip_v4l2(color_cap, depth_cap, duration=3.0, fps=30, depth_device_p
     while frame_count < expected_frames:
         ret_color, color_frame = color_cap.read()
         if ret_color and color_frame is not None:
-            color_frames.append(color_frame.copy())
+            # cap.read() returns a freshly allocated frame, no copy needed
+            color_frames.append(color_frame)
             frame_time = time.time()
             timestamps.append(frame_time)
             
@@ -448,8 +584,111 @@ def capture_clip_v4l2(color_cap, depth_cap, duration=3.0, fps=30, depth_device_p
     
     return color_frames, depth_frames if depth_frames else None, timestamps
 
-def save_clip(color_frames, depth_frames, timestamps, output_dir, clip_num):
-    """Save clip as MP4 video + depth data"""
+# Jetson hardware H.264 encode (NVENC via nvv4l2h264enc) for the color MP4.
+# Frames are converted to NV12 in NVMM by nvvidconv (VIC) instead of on the CPU.
+HW_VIDEO_PIPELINE = (
+    "appsrc ! videoconvert ! video/x-raw,format=BGRx ! "
+    "nvvidconv ! video/x-raw(memory:NVMM),format=NV12 ! "
+    "nvv4l2h264enc maxperf-enable=1 ! h264parse ! qtmux ! filesink location={path}"
+)
+
+# None until the first clip tries the hardware encoder
+_hw_encoder_available = None
+
+def open_video_writer(video_filename, fps, width, height):
+    """Open an MP4 writer, preferring the Jetson hardware encoder
+    
+    Falls back to OpenCV's software mp4v encoder when OpenCV has no GStreamer
+    support or the NVENC elements are missing. Returns (writer, codec_name).
+    """
+    global _hw_encoder_available
+    if _hw_encoder_available is not False:
+        out = cv2.VideoWriter(HW_VIDEO_PIPELINE.format(path=video_filename), cv2.CAP_GSTREAMER,
+                              0, fps, (width, height))
+        if out.isOpened():
+            _hw_encoder_available = True
+            return out, 'h264 (nvv4l2h264enc)'
+        if _hw_encoder_available is None:
+            print("  ⚠️  Hardware H.264 encoder unavailable - using software mp4v")
+        _hw_encoder_available = False
+    
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(video_filename, fourcc, fps, (width, height)), 'mp4v'
+
+# One strided depth montage per clip for quick inspection (raw depth is in depth_raw.npy)
+SAVE_DEPTH_PREVIEW = True
+DEPTH_PREVIEW_FRAMES = 16  # 4x4 grid
+DEPTH_PREVIEW_COLS = 4
+
+def visualize_depth(depth, depth_min, depth_max, colormap=cv2.COLORMAP_JET):
+    """Colorize a depth image over a fixed range; invalid (0) pixels stay black"""
+    # convertScaleAbs scales and saturates to uint8 in one vectorized pass
+    alpha = 255.0 / max(float(depth_max) - float(depth_min), 1.0)
+    depth8 = cv2.convertScaleAbs(depth, alpha=alpha, beta=-float(depth_min) * alpha)
+    colored = cv2.applyColorMap(depth8, colormap)
+    valid8 = cv2.compare(depth, 0, cv2.CMP_GT)
+    return cv2.bitwise_and(colored, colored, mask=valid8)
+
+def save_depth_preview(depth_stack, preview_path, depth_min, depth_max):
+    """Save a single JPEG montage of evenly spaced frames from a (T, H, W) depth clip
+    
+    depth_min/depth_max are the clip's valid depth range (raw units), shared by
+    all frames so the montage is temporally consistent.
+    """
+    n = min(DEPTH_PREVIEW_FRAMES, len(depth_stack))
+    indices = np.linspace(0, len(depth_stack) - 1, n).astype(int)
+    sampled = depth_stack[indices, ::2, ::2]  # Half resolution keeps the montage small
+    
+    # Pad the last row with empty frames
+    rows = -(-n // DEPTH_PREVIEW_COLS)
+    padded = np.zeros((rows * DEPTH_PREVIEW_COLS,) + sampled.shape[1:], dtype=sampled.dtype)
+    padded[:n] = sampled
+    montage = np.vstack([np.hstack(padded[r * DEPTH_PREVIEW_COLS:(r + 1) * DEPTH_PREVIEW_COLS])
+                         for r in range(rows)])
+    
+    montage_vis = visualize_depth(montage, depth_min, depth_max)
+    return cv2.imwrite(preview_path, montage_vis, [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+def approx_median_depth(depth_stack, stride=4):
+    """Median of the valid (non-zero) depth in a uint16 clip, without sorting
+    
+    Builds a per-value histogram of a strided sample (1/stride^2 of the pixels)
+    and walks its cumulative sum, so there is no sort and no masked copy.
+    Returns None if the sample has no valid pixels.
+    """
+    sample = depth_stack[:, ::stride, ::stride]
+    counts = np.bincount(sample.ravel())
+    counts[0] = 0  # Invalid depth
+    cumulative = np.cumsum(counts)
+    if cumulative[-1] == 0:
+        return None
+    return float(np.searchsorted(cumulative, cumulative[-1] / 2))
+
+def _json_default(obj):
+    """Convert numpy values for the stdlib json fallback"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dump_metadata(metadata, indent=False):
+    """Serialize clip metadata to UTF-8 JSON bytes (orjson when available)"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(metadata, option=option)
+    return json.dumps(metadata, indent=2 if indent else None, default=_json_default).encode('utf-8')
+
+def save_clip(color_frames, depth_frames, timestamps, output_dir, clip_num, run_metadata_path=None,
+              depth_scale=None):
+    """Save clip as MP4 video + depth data
+    
+    depth_scale (meters per raw depth unit) is recorded in the metadata and
+    used to report depth statistics in mm when the frames are raw units.
+    
+    If run_metadata_path is given, the clip metadata is appended as one line to
+    that run-level NDJSON file instead of writing a per-clip metadata.json.
+    """
     os.makedirs(output_dir, exist_ok=True)
     
     if len(color_frames) == 0:
@@ -462,90 +701,81 @@ def save_clip(color_frames, depth_frames, timestamps, output_dir, clip_num):
     
     # Save color video as MP4
     video_filename = os.path.join(output_dir, f"clip_{clip_num:04d}.mp4")
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(video_filename, fourcc, fps, (width, height))
+    out, video_codec = open_video_writer(video_filename, fps, width, height)
     
     if out.isOpened():
         for frame in color_frames:
             out.write(frame)
         out.release()
         file_size = os.path.getsize(video_filename) / (1024 * 1024)  # MB
-        print(f"  ✓ Saved video: {video_filename} ({file_size:.1f} MB)")
+        print(f"  ✓ Saved video: {video_filename} ({file_size:.1f} MB, {video_codec})")
     else:
         print(f"  ✗ Could not create video file")
         video_filename = None
+        video_codec = None
     
     # Save depth data
-    if depth_frames and len(depth_frames) > 0 and any(d is not None for d in depth_frames):
+    if depth_frames is not None and len(depth_frames) > 0 and any(d is not None for d in depth_frames):
         depth_dir = os.path.join(output_dir, 'depth')
         os.makedirs(depth_dir, exist_ok=True)
         
         valid_depth_frames = [d for d in depth_frames if d is not None]
+        depth_frame_indices = [i for i, d in enumerate(depth_frames) if d is not None]
         
-        # Save depth frames in multiple formats for easy Python access
-        import pickle
-        
-        for i, depth_data in enumerate(depth_frames):
-            if depth_data is None:
-                continue
-            
-            # Convert to uint16 if it's float (mm)
-            if depth_data.dtype == np.float32 or depth_data.dtype == np.float64:
-                depth_uint16 = depth_data.astype(np.uint16)
-            else:
-                depth_uint16 = depth_data
-            
-            # Save as .npy (numpy array - easy to load with np.load)
-            npy_path = os.path.join(depth_dir, f"frame_{i:06d}_depth.npy")
-            np.save(npy_path, depth_uint16)
-            
-            # Save as .pkl (pickle - also easy Python access)
-            pkl_path = os.path.join(depth_dir, f"frame_{i:06d}_depth.pkl")
-            with open(pkl_path, 'wb') as f:
-                pickle.dump(depth_uint16, f)
-        
-        # Save all depth frames in a single Python pickle file for easy loading
-        all_depth_pkl = os.path.join(depth_dir, 'all_depth_frames.pkl')
-        with open(all_depth_pkl, 'wb') as f:
-            pickle.dump(valid_depth_frames, f)
+        # Save all depth frames as a single (T, H, W) uint16 array - one write per clip
+        # instead of one file per frame (float mm frames are truncated to integer mm)
+        if isinstance(depth_frames, np.ndarray):
+            depth_stack = depth_frames.astype(np.uint16, copy=False)  # Already a contiguous clip buffer
+        else:
+            depth_stack = np.stack(valid_depth_frames).astype(np.uint16, copy=False)
+        depth_file = os.path.join(depth_dir, 'depth_raw.npy')
+        np.save(depth_file, depth_stack)
         
-        # Also save as a Python script with numpy arrays (for direct Python access)
-        py_path = os.path.join(depth_dir, 'depth_data.py')
-        with open(py_path, 'w') as f:
-            f.write("# Depth data for each frame\n")
-            f.write("# Load with: import numpy as np; exec(open('depth_data.py').read())\n")
-            f.write("import numpy as np\n\n")
-            f.write(f"# Total frames: {len(valid_depth_frames)}\n\n")
-            for i, depth_data in enumerate(depth_frames):
-                if depth_data is None:
-                    continue
-                depth_uint16 = depth_data.astype(np.uint16) if depth_data.dtype in [np.float32, np.float64] else depth_data
-                # Save as numpy array string representation (compressed)
-                f.write(f"# Frame {i}\n")
-                f.write(f"frame_{i}_depth = np.load('frame_{i:06d}_depth.npy')  # Shape: {depth_uint16.shape}, dtype: {depth_uint16.dtype}\n\n")
+        # Frame indices (into the color video) that have a depth frame
+        np.save(os.path.join(depth_dir, 'frame_indices.npy'), np.asarray(depth_frame_indices, dtype=np.int32))
         
         print(f"  ✓ Saved {len(valid_depth_frames)} depth frames to {depth_dir}/")
-        print(f"    - Individual: frame_XXXXXX_depth.npy (numpy)")
-        print(f"    - Individual: frame_XXXXXX_depth.pkl (pickle)")
-        print(f"    - Combined: all_depth_frames.pkl (all frames)")
-        print(f"    - Python: depth_data.py (load helper)")
+        print(f"    - Combined: depth_raw.npy {depth_stack.shape} {depth_stack.dtype} (np.load)")
+        print(f"    - Index: frame_indices.npy (color frame index of each depth frame)")
         
-        # Calculate depth statistics
-        all_valid = np.concatenate([d[d > 0].flatten() for d in valid_depth_frames if d is not None])
-        if len(all_valid) > 0:
+        # Calculate depth statistics with masked reductions over the stacked clip
+        # (matches the saved uint16 values; invalid pixels are 0 so they add nothing
+        # to the sums, and no reduction needs a masked copy of the clip).
+        # The valid mask is computed once and the resulting range is reused by the preview.
+        valid = depth_stack > 0
+        valid_counts = valid.sum(axis=(1, 2))
+        valid_total = int(valid_counts.sum())
+        if valid_total > 0:
+            # Raw units are scaled to mm only for the values written to the metadata
+            mm_per_unit = depth_scale * 1000.0 if depth_scale else 1.0
+            frame_sums = depth_stack.sum(axis=(1, 2), dtype=np.uint64)
+            per_frame_mean = frame_sums / np.maximum(valid_counts, 1)
+            median_depth = approx_median_depth(depth_stack)
+            min_depth = float(depth_stack.min(initial=np.iinfo(np.uint16).max, where=valid))
+            max_depth = float(depth_stack.max())
             depth_stats = {
-                'mean_depth': float(np.mean(all_valid)),
-                'median_depth': float(np.median(all_valid)),
-                'min_depth': float(np.min(all_valid)),
-                'max_depth': float(np.max(all_valid)),
-                'units': 'mm' if any(d.dtype == np.float32 for d in valid_depth_frames) else 'raw',
+                'mean_depth': float(frame_sums.sum()) / valid_total * mm_per_unit,
+                'median_depth': median_depth * mm_per_unit if median_depth is not None else None,
+                'min_depth': min_depth * mm_per_unit,
+                'max_depth': max_depth * mm_per_unit,
+                'valid_pixel_ratio': valid_total / depth_stack.size,
+                'per_frame_mean_depth': np.round(per_frame_mean * mm_per_unit, 1),  # Serialized as a list
+                'units': 'mm' if depth_scale or any(d.dtype == np.float32 for d in valid_depth_frames) else 'raw',
             }
+            
+            if SAVE_DEPTH_PREVIEW and save_depth_preview(depth_stack, os.path.join(depth_dir, 'depth_preview.jpg'),
+                                                         min_depth, max_depth):
+                print(f"    - Preview: depth_preview.jpg (montage)")
         else:
             depth_stats = {'note': 'No valid depth pixels found'}
     else:
         depth_stats = None
+        depth_stack = None
         print(f"  ⚠️  No depth data available")
     
+    # Save capture timestamps as a single float64 array
+    np.save(os.path.join(output_dir, 'timestamps.npy'), np.asarray(timestamps, dtype=np.float64))
+    
     # Save metadata
     metadata = {
         'clip_num': clip_num,
@@ -555,16 +785,31 @@ def save_clip(color_frames, depth_frames, timestamps, output_dir, clip_num):
         'resolution': {'width': width, 'height': height},
         'has_depth': depth_frames is not None and len(depth_frames) > 0,
         'video_file': os.path.basename(video_filename) if video_filename else None,
+        'video_codec': video_codec,
         'timestamp': datetime.now().isoformat()
     }
     
+    if depth_stack is not None:
+        metadata['depth_file'] = os.path.join('depth', 'depth_raw.npy')
+        metadata['depth_shape'] = list(depth_stack.shape)  # (T, H, W)
+        metadata['depth_dtype'] = str(depth_stack.dtype)
+        if depth_scale:
+            metadata['depth_scale'] = depth_scale  # meters per raw depth unit
+    metadata['timestamps_file'] = 'timestamps.npy'
+    
     if depth_stats:
         metadata['depth_stats'] = depth_stats
     
-    with open(os.path.join(output_dir, 'metadata.json'), 'w') as f:
-        json.dump(metadata, f, indent=2)
-    
-    print(f"  ✓ Saved metadata")
+    if run_metadata_path:
+        metadata['clip_dir'] = os.path.basename(output_dir)
+        line = dump_metadata(metadata) + b'\n'
+        with _run_metadata_lock, open(run_metadata_path, 'ab') as f:
+            f.write(line)
+        print(f"  ✓ Appended metadata to {os.path.basename(run_metadata_path)}")
+    else:
+        with open(os.path.join(output_dir, 'metadata.json'), 'wb') as f:
+            f.write(dump_metadata(metadata, indent=True))
+        print(f"  ✓ Saved metadata")
 
 def main():
     clip_duration = 3.0  # seconds
@@ -711,13 +956,17 @@ def main():
     output_base = os.path.join(base_dir, timestamp)
     os.makedirs(output_base, exist_ok=True)
     
+    # One metadata line per clip, appended by the save thread
+    run_metadata_path = os.path.join(output_base, 'clips.ndjson')
+    
     print(f"\nOutput directory: {output_base}/")
     print("Press Ctrl+C to stop\n")
     
-    # Background thread for saving clips (non-blocking)
-    save_queue = Queue(maxsize=2)  # Allow 2 clips queued
+    # Background threads for saving clips (non-blocking)
+    save_queue = ClipSaveQueue(SAVE_QUEUE_MAX_BYTES)  # Bounded by bytes, not clip count
     save_thread_running = threading.Event()
     save_thread_running.set()
+    saved_clip_numbers = itertools.count(1)  # Shared by all save workers
     
     def save_worker():
         """Background thread to save clips"""
@@ -725,22 +974,31 @@ def main():
         while save_thread_running.is_set() or not save_queue.empty():
             try:
                 # Wait for clip with timeout
-                item = save_queue.get(timeout=0.5)
-                color_frames, depth_frames, timestamps = item
-                clip_num += 1
+                nbytes, item = save_queue.get(timeout=0.5)
+            except Empty:
+                continue
+            try:
+                color_frames, depth_frames, timestamps, depth_scale = item
+                clip_num = next(saved_clip_numbers)
                 
                 clip_dir = os.path.join(output_base, f"clip_{clip_num:04d}")
-                save_clip(color_frames, depth_frames, timestamps, clip_dir, clip_num)
+                save_clip(color_frames, depth_frames, timestamps, clip_dir, clip_num, run_metadata_path,
+                          depth_scale)
                 print(f"  ✓ Clip #{clip_num} saved (background)")
-                save_queue.task_done()
-            except:
-                pass
+            except Exception as e:
+                print(f"  ✗ Failed to save clip #{clip_num}: {e}")
+            finally:
+                save_queue.task_done(nbytes)
     
-    save_thread = threading.Thread(target=save_worker, daemon=True)
-    save_thread.start()
+    save_threads = [threading.Thread(target=save_worker, daemon=True) for _ in range(SAVE_WORKERS)]
+    for save_thread in save_threads:
+        save_thread.start()
     
     clip_num = 0
     
+    # RealSense pipeline kept streaming across clips (started on first use)
+    realsense_session = None
+    
     try:
         while True:
             clip_num += 1
@@ -748,7 +1006,23 @@ def main():
             
             # Capture clip (returns immediately)
             if use_realsense:
-                color_frames, depth_frames, timestamps = capture_clip_realsense(clip_duration, target_fps)
+                if realsense_session is None:
+                    realsense_session = start_realsense_pipeline(target_fps)
+                if realsense_session is not None:
+                    color_frames, depth_frames, timestamps, depth_scale = capture_clip_realsense(
+                        clip_duration, target_fps, session=realsense_session
+                    )
+                    if color_frames is not None and len(color_frames) == 0:
+                        # Streaming stalled (e.g. USB hiccup): restart the pipeline on
+                        # the next clip; if it can't start, that clip falls back to V4L2
+                        print("  ⚠️  RealSense returned no frames - restarting pipeline")
+                        try:
+                            realsense_session[0].stop()
+                        except RuntimeError:
+                            pass
+                        realsense_session = None
+                else:
+                    color_frames = None
                 if color_frames is None:
                     print("  ✗ RealSense SDK capture failed - falling back to V4L2")
                     # Fallback to V4L2 if SDK fails
@@ -791,6 +1065,7 @@ def main():
                     color_frames, depth_frames, timestamps = capture_clip_v4l2(
                         color_cap, depth_cap, clip_duration, actual_fps_int, depth_device_path, None
                     )
+                    depth_scale = None  # V4L2 depth is saved in raw units
                     
                     if len(color_frames) == 0:
                         print("  ✗ No frames captured, skipping...")
@@ -805,17 +1080,20 @@ def main():
                 color_frames, depth_frames, timestamps = capture_clip_v4l2(
                     color_cap, depth_cap, clip_duration, actual_fps_int, depth_device_path, None
                 )
+                depth_scale = None  # V4L2 depth is saved in raw units
             
             if len(color_frames) == 0:
                 print("  ✗ No frames captured, skipping...")
                 continue
             
             # Queue for background save (non-blocking) - only save once here
+            nbytes = clip_nbytes(color_frames, depth_frames)
             try:
-                save_queue.put_nowait((color_frames, depth_frames, timestamps))
+                save_queue.put_nowait(nbytes, (color_frames, depth_frames, timestamps, depth_scale))
                 print(f"  ✓ Clip #{clip_num} queued for save (continuing capture...)")
-            except:
-                print(f"  ⚠️  Save queue full - dropping clip #{clip_num}")
+            except Full:
+                print(f"  ⚠️  Save queue full ({save_queue.total_bytes / (1024 * 1024):.0f} MB pending) - "
+                      f"dropping clip #{clip_num} ({nbytes / (1024 * 1024):.0f} MB)")
             
             # No delay - continue immediately to next clip!
     
@@ -823,13 +1101,17 @@ def main():
         print("\n\nStopping...")
     
     finally:
-        # Stop save thread
+        # Stop save threads
         save_thread_running.clear()
-        save_thread.join(timeout=5.0)
+        for save_thread in save_threads:
+            save_thread.join(timeout=5.0)
         
         # Wait for any pending saves
         save_queue.join()
         
+        if realsense_session is not None:
+            realsense_session[0].stop()
+            print(f"✓ RealSense pipeline stopped")
         if color_cap:
             color_cap.release()
             print(f"✓ Color camera released")
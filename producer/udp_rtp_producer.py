@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 """
 Working DeepStream UDP RTP Producer for Jetson Orin Nano
-Captures RGB from Intel RealSense, converts to grayscale 240x240, streams to DGX Spark
-Uses x264enc (software encoder) - TESTED AND WORKING
+Captures RGB from Intel RealSense, scales to 240x240 (grayscale with x264,
+NV12 colour with NVENC), streams to DGX Spark
+Uses the NVENC hardware encoder (nvv4l2h264enc) when available,
+falls back to x264enc (software encoder) - TESTED AND WORKING
 """
 
+import os
 import sys
+import threading
+import time
 import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import GLib, Gst
@@ -14,12 +19,72 @@ import signal
 # Standard GStreamer initialization
 Gst.init(None)
 
+# Stream destination (DGX Spark)
+STREAM_HOST = '100.64.24.69'
+STREAM_PORT = 8554
+
+# Transport: "rtp" (RTP over UDP, default) or "srt" (MPEG-TS over SRT in caller
+# mode; the consumer must listen with an srt:// URL on the same port)
+STREAM_TRANSPORT = os.getenv('STREAM_TRANSPORT', 'rtp')
+SRT_LATENCY_MS = 60
+
+# v4l2src io-mode values: 0=auto, 1=rw, 2=mmap, 3=userptr, 4=dmabuf, 5=dmabuf-import
+# DMABUF is tried first on the NVENC path; if the camera/driver can't export it
+# the pipeline is restarted with auto (see retry_without_dmabuf)
+V4L2_IO_MODE_AUTO = 0
+V4L2_IO_MODE_DMABUF = 4
+
+# Core and SCHED_FIFO priority for the encoder streaming thread (the q_enc
+# queue's src task). Pinning is skipped if the core isn't available to us.
+ENCODER_CPU = 4
+ENCODER_RT_PRIORITY = 20
+ENCODER_THREAD_NAME = "q_enc:src"
+
+# H.264 bitrate (kbps)
+BITRATE_KBPS = 500
+
+# Element factories resolved once at import (None if the plugin isn't installed)
+ELEMENT_FACTORIES = {
+    name: Gst.ElementFactory.find(name)
+    for name in (
+        "v4l2src", "videoconvert", "videoscale", "capsfilter", "queue",
+        "nvvidconv", "nvv4l2h264enc", "x264enc", "rtph264pay", "udpsink",
+        "h264parse", "mpegtsmux", "srtsink",
+    )
+}
+
+def make_element(factory_name, name):
+    """Create an element from a pre-resolved factory, without a registry lookup"""
+    factory = ELEMENT_FACTORIES.get(factory_name) or Gst.ElementFactory.find(factory_name)
+    if not factory:
+        return None
+    return factory.create(name)
+
+def factory_accepts_format(factory_name, video_format):
+    """Whether an element factory's sink pad template lists the given raw video format"""
+    factory = ELEMENT_FACTORIES.get(factory_name)
+    if not factory:
+        return False
+    for template in factory.get_static_pad_templates():
+        if template.direction == Gst.PadDirection.SINK and video_format in template.get_caps().to_string():
+            return True
+    return False
+
 class SimpleProducer:
     def __init__(self):
         self.pipeline = None
         self.loop = None
+        # Frame counter: written only by the streaming thread (frame_probe),
+        # other threads only read it
         self.frame_count = 0
-        self.start_time = None
+        self.start_ns = 0
+        self.stats_thread = None
+        self.stop_stats = threading.Event()
+        self.source = None
+        # Hardware H.264 encoder if the Jetson multimedia plugins are installed
+        self.use_nvenc = ELEMENT_FACTORIES["nvv4l2h264enc"] is not None
+        # x264 builds with 4:0:0 support list GRAY8 on their sink template
+        self.x264_gray8 = factory_accepts_format("x264enc", "GRAY8")
         
     def bus_call(self, bus, message, loop):
         """Handle bus messages"""
@@ -33,34 +98,117 @@ class SimpleProducer:
         elif t == Gst.MessageType.ERROR:
             err, debug = message.parse_error()
             sys.stderr.write("Error: %s: %s\n" % (err, debug))
-            loop.quit()
+            if not self.retry_without_dmabuf():
+                loop.quit()
         return True
     
-    def frame_probe(self, pad, info):
-        """Probe callback to count frames and show stats"""
-        import time
+    def retry_without_dmabuf(self):
+        """Restart the pipeline with the default v4l2src io-mode if DMABUF capture failed to start"""
+        if self.source is None or self.source.get_property('io-mode') != V4L2_IO_MODE_DMABUF:
+            return False
+        if self.frames_sent() > 0:
+            return False
         
+        sys.stderr.write("DMABUF capture failed, retrying with the default io-mode\n")
+        self.pipeline.set_state(Gst.State.NULL)
+        self.source.set_property('io-mode', V4L2_IO_MODE_AUTO)
+        self.start_ns = time.perf_counter_ns()
+        if self.pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+            return False
+        self.pin_encoder_thread()
+        return True
+    
+    def on_signal(self):
+        """SIGINT/SIGTERM handler dispatched by the GLib main loop"""
+        print("\n\nStopping...")
+        self.loop.quit()
+        return GLib.SOURCE_REMOVE
+    
+    def frame_probe(self, pad, info):
+        """Probe callback to count frames (stats are printed by stats_loop)"""
         self.frame_count += 1
-        
-        # Initialize start time on first frame
-        if self.start_time is None:
-            self.start_time = time.time()
-        
-        # Show stats every 30 frames (~1 second at 30fps)
-        if self.frame_count % 30 == 0:
-            elapsed = time.time() - self.start_time
-            fps = self.frame_count / elapsed if elapsed > 0 else 0
+        return Gst.PadProbeReturn.OK
+    
+    def frames_sent(self):
+        """Frames counted so far"""
+        return self.frame_count
+    
+    def stats_loop(self):
+        """Print frame stats once per second, off the streaming thread"""
+        while not self.stop_stats.wait(1.0):
+            frame_count = self.frames_sent()
+            if frame_count == 0:
+                continue
+            
+            elapsed_ns = time.perf_counter_ns() - self.start_ns
+            fps = frame_count * 1_000_000_000 / elapsed_ns if elapsed_ns > 0 else 0
+            elapsed = elapsed_ns / 1e9
             
             # Print inline update
-            sys.stdout.write(f"\r📊 Frames: {self.frame_count:6d} | FPS: {fps:5.1f} | Runtime: {elapsed:6.1f}s")
+            sys.stdout.write(f"\r📊 Frames: {frame_count:6d} | FPS: {fps:5.1f} | Runtime: {elapsed:6.1f}s")
             sys.stdout.flush()
         
-        return Gst.PadProbeReturn.OK
+    def target_url(self):
+        """Where the stream is being sent"""
+        scheme = "srt" if STREAM_TRANSPORT == "srt" else "udp"
+        return f"{scheme}://{STREAM_HOST}:{STREAM_PORT}"
+    
+    def stream_format(self):
+        """Human-readable description of the frames being encoded"""
+        return "NV12 colour 240x240" if self.use_nvenc else "Grayscale 240x240"
+    
+    def encoder_description(self):
+        """Human-readable name of the H.264 encoder in use"""
+        return "NVENC (nvv4l2h264enc, hardware)" if self.use_nvenc else "x264 (software)"
+    
+    def pin_encoder_thread(self):
+        """Pin the encoder streaming thread to ENCODER_CPU and give it SCHED_FIFO priority"""
+        if ENCODER_CPU not in os.sched_getaffinity(0):
+            return
+        
+        # Streaming threads exist once the pipeline has left READY
+        self.pipeline.get_state(2 * Gst.SECOND)
         
+        # GStreamer names pad task threads "<element>:<pad>"
+        for tid in os.listdir('/proc/self/task'):
+            try:
+                with open(f'/proc/self/task/{tid}/comm') as f:
+                    name = f.read().strip()
+            except OSError:
+                continue
+            if name != ENCODER_THREAD_NAME:
+                continue
+            
+            tid = int(tid)
+            os.sched_setaffinity(tid, {ENCODER_CPU})
+            try:
+                os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(ENCODER_RT_PRIORITY))
+                print(f"✓ Encoder thread pinned to CPU {ENCODER_CPU} (SCHED_FIFO {ENCODER_RT_PRIORITY})")
+            except PermissionError:
+                print(f"✓ Encoder thread pinned to CPU {ENCODER_CPU} (no CAP_SYS_NICE, keeping default scheduler)")
+            return
+    
+    def make_leaky_queue(self, name):
+        """Small queue that drops old buffers instead of blocking upstream"""
+        queue = make_element("queue", name)
+        if not queue:
+            sys.stderr.write("Unable to create queue\n")
+            return None
+        queue.set_property('max-size-buffers', 4)
+        queue.set_property('max-size-bytes', 0)
+        queue.set_property('max-size-time', 0)
+        queue.set_property('leaky', 2)  # downstream
+        return queue
+    
     def setup_pipeline(self):
         """
         Working pipeline (TESTED):
-        Camera → Grayscale → Resize 240x240 → x264 Encode → UDP to DGX Spark
+        x264:  Camera → Grayscale → Resize 240x240 → H.264 Encode (x264) → UDP to DGX Spark
+        NVENC: Camera → NV12 240x240 (nvvidconv) → H.264 Encode (NVENC) → UDP to DGX Spark
+        
+        With NVENC the convert/resize steps collapse into a single nvvidconv
+        pass that stays in NVMM memory up to the encoder. Colour is sent; the
+        consumer converts to GRAY8 after decoding.
         """
         
         print("=" * 60)
@@ -75,149 +223,212 @@ class SimpleProducer:
         
         # STEP 1: Camera source
         print("Creating v4l2src (camera)")
-        source = Gst.ElementFactory.make("v4l2src", "source")
+        source = make_element("v4l2src", "source")
         if not source:
             sys.stderr.write("Unable to create v4l2src\n")
             return False
         source.set_property('device', '/dev/video4')
+        if self.use_nvenc:
+            # Export the camera's DMA buffers so nvvidconv imports them without a memcpy
+            source.set_property('io-mode', V4L2_IO_MODE_DMABUF)
         
-        # STEP 2: Convert to grayscale
-        print("Creating videoconvert (for grayscale)")
-        vidconv1 = Gst.ElementFactory.make("videoconvert", "conv-gray")
-        if not vidconv1:
-            sys.stderr.write("Unable to create videoconvert\n")
-            return False
-        
-        # Grayscale caps
-        caps_gray = Gst.ElementFactory.make("capsfilter", "caps-gray")
-        if not caps_gray:
-            sys.stderr.write("Unable to create capsfilter\n")
-            return False
-        caps_gray.set_property('caps', Gst.Caps.from_string("video/x-raw,format=GRAY8"))
-        
-        # STEP 3: Resize to 240x240
-        print("Creating videoscale (resize)")
-        videoscale = Gst.ElementFactory.make("videoscale", "scaler")
-        if not videoscale:
-            sys.stderr.write("Unable to create videoscale\n")
-            return False
-        
-        # Size caps
-        caps_size = Gst.ElementFactory.make("capsfilter", "caps-size")
-        if not caps_size:
-            sys.stderr.write("Unable to create capsfilter\n")
-            return False
-        caps_size.set_property('caps', Gst.Caps.from_string("video/x-raw,width=240,height=240"))
-        
-        # Convert to I420 for encoder
-        print("Creating videoconvert (for encoder)")
-        vidconv2 = Gst.ElementFactory.make("videoconvert", "conv-i420")
-        if not vidconv2:
-            sys.stderr.write("Unable to create videoconvert\n")
-            return False
-        
-        # I420 caps
-        caps_i420 = Gst.ElementFactory.make("capsfilter", "caps-i420")
-        if not caps_i420:
-            sys.stderr.write("Unable to create capsfilter\n")
-            return False
-        caps_i420.set_property('caps', Gst.Caps.from_string("video/x-raw,format=I420"))
-        
-        # STEP 4: Software H.264 encoder
-        print("Creating x264enc (software encoder)")
-        encoder = Gst.ElementFactory.make("x264enc", "encoder")
-        if not encoder:
-            sys.stderr.write("Unable to create x264enc\n")
-            return False
-        encoder.set_property('tune', 'zerolatency')
-        encoder.set_property('bitrate', 500)  # 500 kbps
+        if self.use_nvenc:
+            # STEP 2+3: Convert and resize in one nvvidconv pass (VIC, NVMM memory)
+            print("Creating nvvidconv (convert + resize)")
+            nvvidconv = make_element("nvvidconv", "conv-nv12")
+            if not nvvidconv:
+                sys.stderr.write("Unable to create nvvidconv\n")
+                return False
+            
+            # NVMM NV12 240x240 caps
+            caps_nv12 = make_element("capsfilter", "caps-nv12")
+            if not caps_nv12:
+                sys.stderr.write("Unable to create capsfilter\n")
+                return False
+            caps_nv12.set_property('caps', Gst.Caps.from_string(
+                "video/x-raw(memory:NVMM),format=NV12,width=240,height=240"))
+            
+            # STEP 4: Hardware H.264 encoder (NVENC)
+            print("Creating nvv4l2h264enc (hardware encoder)")
+            encoder = make_element("nvv4l2h264enc", "encoder")
+            if not encoder:
+                sys.stderr.write("Unable to create nvv4l2h264enc\n")
+                return False
+            encoder.set_property('bitrate', BITRATE_KBPS * 1000)  # bits/sec
+            encoder.set_property('control-rate', 1)  # constant bitrate
+            encoder.set_property('preset-level', 1)  # UltraFastPreset
+            encoder.set_property('insert-sps-pps', True)
+            encoder.set_property('iframeinterval', 30)
+            encoder.set_property('maxperf-enable', True)
+            
+            # Chroma is kept; the consumer converts to GRAY8 after decoding
+            convert_chain = [nvvidconv, caps_nv12]
+        else:
+            # STEP 2: Convert to grayscale
+            print("Creating videoconvert (for grayscale)")
+            vidconv1 = make_element("videoconvert", "conv-gray")
+            if not vidconv1:
+                sys.stderr.write("Unable to create videoconvert\n")
+                return False
+            
+            # Grayscale caps
+            caps_gray = make_element("capsfilter", "caps-gray")
+            if not caps_gray:
+                sys.stderr.write("Unable to create capsfilter\n")
+                return False
+            caps_gray.set_property('caps', Gst.Caps.from_string("video/x-raw,format=GRAY8"))
+            
+            # STEP 3: Resize to 240x240
+            print("Creating videoscale (resize)")
+            videoscale = make_element("videoscale", "scaler")
+            if not videoscale:
+                sys.stderr.write("Unable to create videoscale\n")
+                return False
+            
+            # Size caps
+            caps_size = make_element("capsfilter", "caps-size")
+            if not caps_size:
+                sys.stderr.write("Unable to create capsfilter\n")
+                return False
+            caps_size.set_property('caps', Gst.Caps.from_string("video/x-raw,width=240,height=240"))
+            
+            if self.x264_gray8:
+                # x264 encodes GRAY8 directly (4:0:0), no synthetic chroma plane
+                i420_chain = []
+            else:
+                # Convert to I420 for encoder
+                print("Creating videoconvert (for encoder)")
+                vidconv2 = make_element("videoconvert", "conv-i420")
+                if not vidconv2:
+                    sys.stderr.write("Unable to create videoconvert\n")
+                    return False
+                
+                # I420 caps
+                caps_i420 = make_element("capsfilter", "caps-i420")
+                if not caps_i420:
+                    sys.stderr.write("Unable to create capsfilter\n")
+                    return False
+                caps_i420.set_property('caps', Gst.Caps.from_string("video/x-raw,format=I420"))
+                i420_chain = [vidconv2, caps_i420]
+            
+            # STEP 4: Software H.264 encoder
+            print("Creating x264enc (software encoder)")
+            encoder = make_element("x264enc", "encoder")
+            if not encoder:
+                sys.stderr.write("Unable to create x264enc\n")
+                return False
+            encoder.set_property('tune', 'zerolatency')
+            encoder.set_property('bitrate', BITRATE_KBPS)  # kbps
+            encoder.set_property('byte-stream', True)
+            # Low-latency threading: slice threads across all cores, no B-frames.
+            # Periodic IDRs (no intra-refresh) so a receiver joining mid-stream
+            # can start decoding within key-int-max frames.
+            encoder.set_property('speed-preset', 'ultrafast')
+            encoder.set_property('sliced-threads', True)
+            encoder.set_property('threads', os.cpu_count() or 1)
+            encoder.set_property('key-int-max', 60)
+            encoder.set_property('b-adapt', False)
+            encoder.set_property('bframes', 0)
+            encoder.set_property('ref', 1)
+            
+            convert_chain = [vidconv1, caps_gray, videoscale, caps_size] + i420_chain
         
-        # H.264 parser
-        print("Creating h264parse")
-        h264parse = Gst.ElementFactory.make("h264parse", "parser")
-        if not h264parse:
-            sys.stderr.write("Unable to create h264parse\n")
-            return False
+        if STREAM_TRANSPORT == "srt":
+            # H.264 parser (mpegtsmux needs parsed byte-stream/AU caps)
+            print("Creating h264parse")
+            h264parse = make_element("h264parse", "parser")
+            if not h264parse:
+                sys.stderr.write("Unable to create h264parse\n")
+                return False
+            h264parse.set_property('config-interval', 1)
+            
+            # MPEG-TS muxer
+            print("Creating mpegtsmux")
+            tsmux = make_element("mpegtsmux", "tsmux")
+            if not tsmux:
+                sys.stderr.write("Unable to create mpegtsmux\n")
+                return False
+            
+            # STEP 5: SRT sink to DGX Spark (consumer listens)
+            print("Creating srtsink")
+            sink = make_element("srtsink", "sink")
+            if not sink:
+                sys.stderr.write("Unable to create srtsink\n")
+                return False
+            sink.set_property('uri', f"srt://{STREAM_HOST}:{STREAM_PORT}?mode=caller")
+            sink.set_property('latency', SRT_LATENCY_MS)
+            sink.set_property('sync', False)
+            sink.set_property('async', False)
+            
+            payload_chain = [h264parse, tsmux]
+        else:
+            # RTP payloader (takes the encoder's byte-stream directly, no h264parse)
+            print("Creating rtph264pay")
+            rtppay = make_element("rtph264pay", "rtppay")
+            if not rtppay:
+                sys.stderr.write("Unable to create rtph264pay\n")
+                return False
+            rtppay.set_property('pt', 96)
+            rtppay.set_property('config-interval', 1)
+            
+            # STEP 5: UDP sink to DGX Spark
+            print("Creating udpsink")
+            sink = make_element("udpsink", "sink")
+            if not sink:
+                sys.stderr.write("Unable to create udpsink\n")
+                return False
+            sink.set_property('host', STREAM_HOST)
+            sink.set_property('port', STREAM_PORT)
+            sink.set_property('sync', False)
+            sink.set_property('async', False)
+            # 4MB socket send buffer so IDR bursts (dozens of RTP packets) aren't dropped
+            sink.set_property('buffer-size', 4 * 1024 * 1024)
+            
+            payload_chain = [rtppay]
         
-        # RTP payloader
-        print("Creating rtph264pay")
-        rtppay = Gst.ElementFactory.make("rtph264pay", "rtppay")
-        if not rtppay:
-            sys.stderr.write("Unable to create rtph264pay\n")
+        # Queues put the encoder and the network send on their own threads.
+        # Only q_enc drops (raw frames); q_net never leaks, since dropping
+        # encoded data would corrupt the stream until the next IDR.
+        print("Creating queues (encoder, network)")
+        q_enc = self.make_leaky_queue("q_enc")
+        q_net = make_element("queue", "q_net")
+        if not q_enc or not q_net:
+            sys.stderr.write("Unable to create queue\n")
             return False
-        rtppay.set_property('pt', 96)
-        rtppay.set_property('config-interval', 1)
         
-        # STEP 5: UDP sink to DGX Spark
-        print("Creating udpsink")
-        sink = Gst.ElementFactory.make("udpsink", "sink")
-        if not sink:
-            sys.stderr.write("Unable to create udpsink\n")
-            return False
-        sink.set_property('host', '100.64.24.69')
-        sink.set_property('port', 8554)
-        sink.set_property('sync', False)
+        elements = [source] + convert_chain + [q_enc, encoder] + payload_chain + [q_net, sink]
         
         # Add all elements to pipeline
         print("Adding elements to pipeline")
-        self.pipeline.add(source)
-        self.pipeline.add(vidconv1)
-        self.pipeline.add(caps_gray)
-        self.pipeline.add(videoscale)
-        self.pipeline.add(caps_size)
-        self.pipeline.add(vidconv2)
-        self.pipeline.add(caps_i420)
-        self.pipeline.add(encoder)
-        self.pipeline.add(h264parse)
-        self.pipeline.add(rtppay)
-        self.pipeline.add(sink)
+        for element in elements:
+            self.pipeline.add(element)
         
         # Link all elements
         print("Linking elements")
-        if not source.link(vidconv1):
-            sys.stderr.write("Failed to link source → vidconv1\n")
-            return False
-        if not vidconv1.link(caps_gray):
-            sys.stderr.write("Failed to link vidconv1 → caps_gray\n")
-            return False
-        if not caps_gray.link(videoscale):
-            sys.stderr.write("Failed to link caps_gray → videoscale\n")
-            return False
-        if not videoscale.link(caps_size):
-            sys.stderr.write("Failed to link videoscale → caps_size\n")
-            return False
-        if not caps_size.link(vidconv2):
-            sys.stderr.write("Failed to link caps_size → vidconv2\n")
-            return False
-        if not vidconv2.link(caps_i420):
-            sys.stderr.write("Failed to link vidconv2 → caps_i420\n")
-            return False
-        if not caps_i420.link(encoder):
-            sys.stderr.write("Failed to link caps_i420 → encoder\n")
-            return False
-        if not encoder.link(h264parse):
-            sys.stderr.write("Failed to link encoder → h264parse\n")
-            return False
-        if not h264parse.link(rtppay):
-            sys.stderr.write("Failed to link h264parse → rtppay\n")
-            return False
-        if not rtppay.link(sink):
-            sys.stderr.write("Failed to link rtppay → sink\n")
-            return False
+        for upstream, downstream in zip(elements, elements[1:]):
+            if not upstream.link(downstream):
+                sys.stderr.write(f"Failed to link {upstream.get_name()} → {downstream.get_name()}\n")
+                return False
+        
+        self.source = source
         
         print("=" * 60)
         print("Pipeline Ready!")
         print("  1. Camera (/dev/video4)")
-        print("  2. Convert to GRAY8 (black & white)")
-        print("  3. Resize to 240x240")
-        print("  4. Encode with x264 (software)")
-        print("  5. Stream to DGX Spark (100.64.24.69:8554)")
+        if self.use_nvenc:
+            print("  2+3. Convert to NV12 and resize to 240x240 (nvvidconv)")
+        else:
+            print("  2. Convert to GRAY8 (black & white)")
+            print("  3. Resize to 240x240")
+        print(f"  4. Encode with {self.encoder_description()}")
+        print(f"  5. Stream to DGX Spark ({self.target_url()})")
         print("=" * 60)
         
-        # Add probe to count frames
-        sinkpad = sink.get_static_pad("sink")
-        if sinkpad:
-            sinkpad.add_probe(Gst.PadProbeType.BUFFER, self.frame_probe)
+        # Add probe to count frames. The encoder src pad sees one buffer per
+        # encoded frame; past rtph264pay each frame is several RTP packets.
+        encpad = encoder.get_static_pad("src")
+        if encpad:
+            encpad.add_probe(Gst.PadProbeType.BUFFER, self.frame_probe)
             print("✓ Frame counter attached")
         
         return True
@@ -236,33 +447,44 @@ class SimpleProducer:
         
         # Start pipeline
         print("Starting pipeline...")
+        self.start_ns = time.perf_counter_ns()
         self.pipeline.set_state(Gst.State.PLAYING)
         
+        self.pin_encoder_thread()
+        
+        # Stats reporter
+        self.stats_thread = threading.Thread(target=self.stats_loop, daemon=True)
+        self.stats_thread.start()
+        
         print("\n" + "=" * 60)
         print("🎥 STREAMING TO DGX SPARK")
         print("=" * 60)
-        print("Format: Grayscale 240x240")
-        print("Target: udp://100.64.24.69:8554")
-        print("Encoder: x264 (software)")
+        print(f"Format: {self.stream_format()}")
+        print(f"Target: {self.target_url()}")
+        print(f"Encoder: {self.encoder_description()}")
         print("=" * 60)
         print("Press Ctrl+C to stop")
         print("=" * 60 + "\n")
         
-        try:
-            self.loop.run()
-        except KeyboardInterrupt:
-            print("\n\nStopping...")
-            pass
+        # Ctrl+C / SIGTERM quit the main loop directly from GLib
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signum, self.on_signal)
+        
+        self.loop.run()
         
         # Cleanup
         self.pipeline.set_state(Gst.State.NULL)
+        self.stop_stats.set()
+        if self.stats_thread:
+            self.stats_thread.join(timeout=2.0)
         
         # Print final stats
-        if self.frame_count > 0 and self.start_time:
-            import time
-            elapsed = time.time() - self.start_time
-            fps = self.frame_count / elapsed if elapsed > 0 else 0
-            print(f"\n📊 Final Stats: {self.frame_count} frames in {elapsed:.1f}s ({fps:.1f} fps)")
+        frame_count = self.frames_sent()
+        if frame_count > 0:
+            elapsed_ns = time.perf_counter_ns() - self.start_ns
+            fps = frame_count * 1_000_000_000 / elapsed_ns if elapsed_ns > 0 else 0
+            elapsed = elapsed_ns / 1e9
+            print(f"\n📊 Final Stats: {frame_count} frames in {elapsed:.1f}s ({fps:.1f} fps)")
         
         print("Pipeline stopped")
 
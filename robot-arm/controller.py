@@ -7,17 +7,78 @@ Maps gamepad inputs to robotic arm movements via JSON commands
 import pygame
 import serial
 import json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 import time
 import sys
+import os
+import select
 import argparse
 from datetime import datetime
 
+# Control loop rate while sticks/buttons are active, and how long to block
+# waiting for joystick input while idle
+UPDATE_HZ = 20
+IDLE_TIMEOUT = 0.5
+
+def open_joystick_fd(path):
+    """Open the kernel joystick device non-blocking so the idle loop can select() on it"""
+    if os.name != 'posix':
+        # No O_NONBLOCK or select() on non-socket handles (Windows)
+        return None
+    try:
+        return os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    except OSError as e:
+        print(f"⚠️  Could not open {path} ({e}), polling at {UPDATE_HZ} Hz instead")
+        return None
+
+def wait_for_input(fd, timeout):
+    """Block until the joystick reports new events (or timeout), then drain them"""
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if ready:
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+# Move coalescing: a position update is sent once it differs from the last
+# sent one by more than the step thresholds, or (if it differs by more than
+# the dead-band) once MAX_MOVE_INTERVAL has passed since the last send
+MOVE_STEP_MM = 1.0
+MOVE_STEP_RAD = 0.05
+MOVE_DEADBAND_MM = 0.1
+MOVE_DEADBAND_RAD = 0.01
+MAX_MOVE_INTERVAL = 0.2  # seconds
+
+# Reachable workspace (measured on the arm): mm for X/Y/Z, radians for T
+X_LIMITS = (-474.27, 481.06)
+Y_LIMITS = (-291.94, 297.53)
+Z_LIMITS = (-103.72, 423.18)
+T_LIMITS = (-1.91, 3.37)
+
+def clamp(value, limits):
+    """Clamp value to a (lo, hi) range"""
+    lo, hi = limits
+    return lo if value < lo else hi if value > hi else value
+
+# T:1041 direct XYZ move, pre-formatted (x, y, z in mm, t in radians)
+MOVE_COMMAND_FMT = b'{"T":1041,"x":%.2f,"y":%.2f,"z":%.2f,"t":%.2f}\n'
+
 class RobotArmController:
     def __init__(self, serial_port, baudrate=115200):
         # Initialize serial connection
         self.ser = serial.Serial(serial_port, baudrate, timeout=0.5)
+        if hasattr(self.ser, 'set_buffer_size'):  # Windows only in pyserial
+            self.ser.set_buffer_size(rx_size=4096, tx_size=4096)
         time.sleep(2)  # Wait for connection to stabilize
         
+        # Outgoing commands are buffered and written once per loop (flush_tx)
+        self.tx_buf = bytearray()
+        
         # Movement settings
         self.speed = 2.0  # mm per update
         self.rotation_speed = 0.05  # radians per update
@@ -35,15 +96,18 @@ class RobotArmController:
         
         # Enable torque
         self.send_command({"T": 210, "cmd": 1})
+        self.flush_tx()
         time.sleep(0.5)
         
         # Set initial LED brightness
         self.set_led_brightness(100)
+        self.flush_tx()
         
         # Get current position from robot
         print("📍 Reading current robot position...")
+        self.ser.reset_input_buffer()  # Drop stale data before asking
         self.send_command({"T": 1041, "x": 0, "y": 0, "z": 220, "t": 0.73})
-        time.sleep(0.3)
+        self.flush_tx()
         
         # Read the response to get actual position
         response = self.read_response()
@@ -60,41 +124,80 @@ class RobotArmController:
             self.z = 220
             self.t = 0.73
             print(f"⚠️  Could not read position, using default: X={self.x}, Y={self.y}, Z={self.z}")
+        
+        # Last position sent to the robot (see move_due)
+        self.last_sent = (self.x, self.y, self.z, self.t)
+        self.last_sent_ts = time.monotonic()
+        
+        # From here on writes never block the control loop: flush_tx writes
+        # what the driver accepts and keeps the rest queued for the next tick
+        self.ser.write_timeout = 0
     
-    def read_response(self):
+    def read_response(self, timeout=0.5):
         """Read and parse JSON response from robot"""
         try:
-            # Clear any old data
-            self.ser.reset_input_buffer()
-            
-            # Wait for response
-            time.sleep(0.2)
+            if os.name == 'posix' and hasattr(self.ser, 'fileno'):
+                # Wait for the first byte of the response (returns as soon as it arrives)
+                ready, _, _ = select.select([self.ser.fileno()], [], [], timeout)
+            else:
+                # No select() on serial handles here (Windows): readline() below
+                # waits for the reply, bounded by the port timeout
+                ready = True
             
-            if self.ser.in_waiting:
+            if ready or self.ser.in_waiting:
                 response = self.ser.readline().decode('utf-8').strip()
                 if response:
                     print(f"📥 {response}")
-                    return json.loads(response)
+                    return orjson.loads(response) if ORJSON_AVAILABLE else json.loads(response)
         except Exception as e:
             print(f"⚠️  Error reading response: {e}")
         return None
     
     def send_command(self, command):
-        """Send JSON command to robot arm"""
-        json_str = json.dumps(command) + "\n"
-        self.ser.write(json_str.encode())
+        """Queue JSON command for the robot arm (written by flush_tx)"""
+        if ORJSON_AVAILABLE:
+            self.tx_buf += orjson.dumps(command) + b"\n"
+        else:
+            self.tx_buf += (json.dumps(command) + "\n").encode()
         print(f"📤 {datetime.utcnow().isoformat()}Z | {command}")
     
+    def flush_tx(self):
+        """Write queued commands to the serial port in one transfer"""
+        if not self.tx_buf:
+            return
+        if self.ser.write_timeout == 0 and os.name == 'posix':
+            # pyserial retries EAGAIN in a loop even with write_timeout=0, so
+            # write the (O_NONBLOCK) fd directly and keep what the tty won't take
+            try:
+                written = os.write(self.ser.fileno(), self.tx_buf)
+            except BlockingIOError:
+                written = 0  # tty buffer full, retry next tick
+        else:
+            try:
+                written = self.ser.write(self.tx_buf) or 0
+            except serial.SerialTimeoutException:
+                written = 0  # driver buffer full, retry next tick
+        del self.tx_buf[:written]
+    
     def move_to_position(self):
         """Send current position to robot arm"""
-        command = {
-            "T": 1041,  # Direct XYZ control
-            "x": round(self.x, 2),
-            "y": round(self.y, 2),
-            "z": round(self.z, 2),
-            "t": round(self.t, 2)
-        }
-        self.send_command(command)
+        # T:1041 (direct XYZ control) is sent every update, so format it from a
+        # fixed template instead of going through json.dumps
+        line = MOVE_COMMAND_FMT % (self.x, self.y, self.z, self.t)
+        self.tx_buf += line
+        self.last_sent = (self.x, self.y, self.z, self.t)
+        self.last_sent_ts = time.monotonic()
+        print(f"📤 {datetime.utcnow().isoformat()}Z | {line[:-1].decode()}")
+    
+    def move_due(self):
+        """Whether the current position should be sent now (None if it matches the last send)"""
+        last_x, last_y, last_z, last_t = self.last_sent
+        delta_mm = max(abs(self.x - last_x), abs(self.y - last_y), abs(self.z - last_z))
+        delta_rad = abs(self.t - last_t)
+        if delta_mm <= MOVE_DEADBAND_MM and delta_rad <= MOVE_DEADBAND_RAD:
+            return None
+        return (delta_mm > MOVE_STEP_MM or delta_rad > MOVE_STEP_RAD or
+                time.monotonic() - self.last_sent_ts >= MAX_MOVE_INTERVAL)
     
     def apply_deadzone(self, value):
         """Apply deadzone to analog stick values"""
@@ -149,6 +252,8 @@ class RobotArmController:
     
     def close(self):
         """Clean up and close connection"""
+        self.ser.write_timeout = None  # blocking, so nothing queued is lost
+        self.flush_tx()
         self.ser.close()
         print("👋 Connection closed")
 
@@ -157,6 +262,8 @@ def main():
     parser = argparse.ArgumentParser(description='Control RoArm-M2-S with 8BitDo Pro 3')
     parser.add_argument('port', type=str, help='Serial port (e.g., /dev/ttyUSB0 or COM3)')
     parser.add_argument('--baudrate', type=int, default=115200, help='Baudrate (default: 115200)')
+    parser.add_argument('--js-device', type=str, default='/dev/input/js0',
+                        help='Kernel joystick device used to sleep while idle (default: /dev/input/js0)')
     args = parser.parse_args()
     
     # Initialize pygame and controller
@@ -193,16 +300,17 @@ def main():
         sys.exit(1)
     
     clock = pygame.time.Clock()
+    js_fd = open_joystick_fd(args.js_device)
     running = True
     
     try:
         while running:
-            # Process events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-            
+            # Process events: one pump, then copy out only QUIT events
+            # (axis/button state is read directly from the joystick below)
             pygame.event.pump()
+            if pygame.event.get(eventtype=pygame.QUIT, pump=False):
+                running = False
+            pygame.event.clear(pump=False)  # drop the rest so the SDL queue can't fill up
             
             # Read analog sticks
             left_x = robot.apply_deadzone(joystick.get_axis(0))   # Left stick X
@@ -211,32 +319,25 @@ def main():
             right_y = robot.apply_deadzone(joystick.get_axis(3))  # Right stick Y (Z axis)
             
             # Update position based on stick input
-            movement_occurred = False
-            old_x, old_y, old_z, old_t = robot.x, robot.y, robot.z, robot.t
-            
             if left_x != 0:
                 robot.y -= left_x * robot.speed  # Stick left/right controls Y (inverted)
-                robot.y = max(-291.94, min(297.53, robot.y))  # Actual Y range
+                robot.y = clamp(robot.y, Y_LIMITS)
             
             if left_y != 0:
                 robot.x -= left_y * robot.speed  # Stick forward/back controls X (inverted)
-                robot.x = max(-474.27, min(481.06, robot.x))  # Actual X range
+                robot.x = clamp(robot.x, X_LIMITS)
             
             if right_y != 0:
                 robot.z -= right_y * robot.speed  # Inverted for intuitive control
-                robot.z = max(-103.72, min(423.18, robot.z))  # Actual Z range
+                robot.z = clamp(robot.z, Z_LIMITS)
             
             if right_x != 0:
                 robot.t += right_x * robot.rotation_speed  # Right opens, left closes gripper
-                robot.t = max(-1.91, min(3.37, robot.t))  # Actual gripper range
-            
-            # Only send command if position changed significantly (>0.1mm or >0.01 radians)
-            if (abs(robot.x - old_x) > 0.1 or abs(robot.y - old_y) > 0.1 or 
-                abs(robot.z - old_z) > 0.1 or abs(robot.t - old_t) > 0.01):
-                movement_occurred = True
+                robot.t = clamp(robot.t, T_LIMITS)
             
-            # Send position update if movement occurred
-            if movement_occurred:
+            # Coalesce small moves: send on a large step, or after MAX_MOVE_INTERVAL
+            move_due = robot.move_due()
+            if move_due:
                 robot.move_to_position()
             
             # LED control with L1 and R1 (held buttons)
@@ -252,8 +353,18 @@ def main():
                 if new_brightness != robot.led_brightness:
                     robot.set_led_brightness(new_brightness)
             
-            # Limit update rate
-            clock.tick(20)  # 20 FPS - slower updates prevent flooding the robot
+            # One serial write per loop for everything queued above
+            robot.flush_tx()
+            
+            # Limit update rate: 20 FPS while input is active (slower updates
+            # prevent flooding the robot), otherwise sleep until the joystick moves
+            active = (left_x or left_y or right_x or right_y or move_due is not None or
+                      joystick.get_button(4) or joystick.get_button(5))
+            if active or js_fd is None:
+                clock.tick(UPDATE_HZ)
+            else:
+                wait_for_input(js_fd, IDLE_TIMEOUT)
+                clock.tick()  # restart the frame timer after sleeping
     
     except KeyboardInterrupt:
         print("\n⚠️  Interrupted by user")
@@ -262,8 +373,11 @@ def main():
         # Return to home before closing
         print("\n🏠 Returning to home position...")
         robot.reset_position()
+        robot.flush_tx()
         time.sleep(1)
         robot.close()
+        if js_fd is not None:
+            os.close(js_fd)
         pygame.quit()
         print("✅ Shutdown complete")
 
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import serial, time, json, sys
+import serial, time, sys, math
 from datetime import datetime
 
 PORT = sys.argv[1]
@@ -9,23 +9,30 @@ STEP = 1.5       # mm per micro-move
 SLEEP = 0.01     # slow for smoothness
 T_ANGLE = 3.3   # keep same IK branch
 
-def send(ser, x, y, z):
-    payload = {"T":1041, "x":x, "y":y, "z":z, "t":T_ANGLE}
-    ser.write((json.dumps(payload)+"\n").encode())
-    print(f"{datetime.utcnow().isoformat()}Z | {payload}")
-    time.sleep(SLEEP)
+MOVE_FMT = b'{"T":1041,"x":%.2f,"y":%.2f,"z":%.2f,"t":%.2f}\n'  # skips json.dumps per step
+
+def send_path(ser, waypoints, pos):
+    # lines are formatted up front; writes are paced on a fixed SLEEP grid
+    lines = [MOVE_FMT % (x, y, z, T_ANGLE) for x, y, z in waypoints]
+    t0 = time.monotonic()
+    for i, (line, waypoint) in enumerate(zip(lines, waypoints), 1):
+        ser.write(line)
+        pos[:] = waypoint  # pos tracks what was actually sent (for Ctrl+C homing)
+        print(f"{datetime.utcnow().isoformat()}Z | {line[:-1].decode()}")
+        delay = t0 + i*SLEEP - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
 def move_axis(ser, start, end, axis, pos):
+    i = {"x":0,"y":1,"z":2}[axis]
     step = STEP if end>start else -STEP
-    v = start
-    while abs(v-end) > abs(step):
-        v += step
-        if axis == "x": pos[0] = v
-        elif axis == "y": pos[1] = v
-        elif axis == "z": pos[2] = v
-        send(ser, *pos)
-    pos[{"x":0,"y":1,"z":2}[axis]] = end
-    send(ser, *pos)
+    n = max(math.ceil(abs(end-start)/STEP) - 1, 0)  # micro-moves before the final one
+    waypoints = []
+    for v in [start + step*k for k in range(1, n+1)] + [end]:
+        p = list(pos)
+        p[i] = v
+        waypoints.append(p)
+    send_path(ser, waypoints, pos)
 
 def go(ser, tx, ty, tz, pos):
     # move X first, then Y, then Z
@@ -1,7 +1,7 @@
 import torch
+import torch.nn.functional as F
 import numpy as np
-import cv2
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from transformers import (
     AutoVideoProcessor,
     AutoModelForVideoClassification,
@@ -14,6 +14,7 @@ class VJEPAInferenceEngine:
     
     def __init__(self):
         self.device = None
+        self.use_fp16 = False
         self.model = None
         self.processor = None
         self.hf_repo = "facebook/vjepa2-vitl-fpc16-256-ssv2"
@@ -28,21 +29,49 @@ class VJEPAInferenceEngine:
         self.device = infer_device()
         print(f"Using device: {self.device}")
         
+        # FP16 weights on CUDA (tensor cores); the forward runs under autocast
+        self.use_fp16 = str(self.device).startswith("cuda")
         self.model = AutoModelForVideoClassification.from_pretrained(
-            self.hf_repo
+            self.hf_repo,
+            torch_dtype=torch.float16 if self.use_fp16 else torch.float32
         ).to(self.device)
         self.processor = AutoVideoProcessor.from_pretrained(self.hf_repo)
         self.model.eval()
         self.model_loaded = True
         print("Model loaded successfully")
     
-    def predict(self, frames: List[np.ndarray], top_k: int = 5) -> List[Dict[str, float]]:
+    def predict(self, frames: List[np.ndarray], top_k: int = 5,
+                size: Optional[Tuple[int, int]] = None) -> List[Dict[str, float]]:
         """
         Predict from list of frames (BGR format)
         
         Args:
-            frames: List of numpy arrays [H, W, 3] in BGR format
+            frames: List of numpy arrays [H, W, 3] in BGR format, all the same size
             top_k: Number of top predictions to return
+            size: Optional (height, width) to resize the clip to on the device
+        
+        Returns:
+            List of dicts with 'label' and 'confidence' keys
+        """
+        if not self.model_loaded:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        
+        # Stack as uint8 [T, H, W, 3] BGR and move to the device once; the
+        # BGR->RGB flip and HWC->CHW permute run there as a single pass
+        video_tensor = torch.from_numpy(np.stack(frames)).to(self.device)
+        video_tensor = video_tensor.flip(-1).permute(0, 3, 1, 2)  # [T, C, H, W] RGB
+        
+        return self.predict_tensor(video_tensor, top_k=top_k, size=size)
+    
+    def predict_tensor(self, video_tensor: torch.Tensor, top_k: int = 5,
+                       size: Optional[Tuple[int, int]] = None) -> List[Dict[str, float]]:
+        """
+        Predict from a clip tensor already on the device
+        
+        Args:
+            video_tensor: Tensor [T, C, H, W] in RGB format
+            top_k: Number of top predictions to return
+            size: Optional (height, width) to resize the clip to
         
         Returns:
             List of dicts with 'label' and 'confidence' keys
@@ -52,41 +81,44 @@ class VJEPAInferenceEngine:
         
         # Validate frame count
         expected_frames = self.model.config.frames_per_clip
-        if len(frames) != expected_frames:
+        if video_tensor.shape[0] != expected_frames:
             raise ValueError(
-                f"Expected {expected_frames} frames, got {len(frames)}"
+                f"Expected {expected_frames} frames, got {video_tensor.shape[0]}"
             )
         
-        # Convert BGR to RGB
-        frames_rgb = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+        video_tensor = video_tensor.float()
         
-        # Convert to torch tensors [T, C, H, W]
-        # Each frame is [H, W, 3] RGB, convert to [C, H, W]
-        video_tensor = torch.stack([
-            torch.from_numpy(f).permute(2, 0, 1).float() 
-            for f in frames_rgb
-        ])  # [T, C, H, W]
+        # Resize the whole clip in one batched call, only if needed
+        if size is not None and tuple(video_tensor.shape[-2:]) != tuple(size):
+            video_tensor = F.interpolate(video_tensor, size=tuple(size), mode="bilinear",
+                                         align_corners=False)
         
         # Preprocess using AutoVideoProcessor
         # Processor expects list of [C, H, W] tensors
         inputs = self.processor(list(video_tensor), return_tensors="pt").to(self.device)
         
         # Inference
-        with torch.no_grad():
+        with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=torch.float16,
+                                                     enabled=self.use_fp16):
             outputs = self.model(**inputs)
         
-        logits = outputs.logits
-        probs = torch.softmax(logits, dim=-1)[0]
+        logits = outputs.logits.float()[0]
+        
+        # Top-k on the logits (same ranking as softmax); only the survivors are
+        # turned into probabilities, normalized over all classes via logsumexp
+        top_k_logits, top_k_indices = torch.topk(logits, top_k)
+        top_k_vals = torch.exp(top_k_logits - torch.logsumexp(logits, dim=-1))
         
-        # Top-k results
-        top_k_vals, top_k_indices = torch.topk(probs, top_k)
+        # Top-k results, brought to the host in one transfer each
+        top_k_vals = top_k_vals.cpu().tolist()
+        top_k_indices = top_k_indices.cpu().tolist()
         
         predictions = []
         for idx, prob in zip(top_k_indices, top_k_vals):
-            label = self.model.config.id2label[idx.item()]
+            label = self.model.config.id2label[idx]
             predictions.append({
                 "label": label,
-                "confidence": float(prob.item())
+                "confidence": prob
             })
         
         return predictions
@@ -1,14 +1,28 @@
+import asyncio
 import base64
+import struct
 import uuid
 import numpy as np
 import cv2
+import torch
 import logging
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
 from app.models import InferenceRequest, PredictionResponse, HealthResponse, Prediction
 from app.inference import VJEPAInferenceEngine
 
+# Batched NVJPEG decode on the GPU (list input + device= needs torchvision >= 0.19);
+# cv2 is the fallback
+try:
+    import torchvision
+    from torchvision.io import decode_jpeg, ImageReadMode
+    TORCHVISION_VERSION = tuple(int(part) for part in torchvision.__version__.split(".")[:2])
+    NVJPEG_AVAILABLE = TORCHVISION_VERSION >= (0, 19) and torch.cuda.is_available()
+except (ImportError, ValueError):
+    NVJPEG_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,12 +31,48 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="VJEPA2 Inference Service",
     description="Video classification inference service using Facebook VJEPA2 model",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Global inference engine
 engine = None
 
+# Decode + inference run on one worker thread that owns the GPU, keeping the
+# event loop free; requests beyond MAX_PENDING_REQUESTS are turned away with 503
+inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+MAX_PENDING_REQUESTS = 4
+pending_requests = 0
+
+# Frame header for /api/v1/infer/raw: little-endian uint32 JPEG length
+FRAME_HEADER = struct.Struct("<I")
+
+
+def decode_frames_nvjpeg(frames_jpeg, device):
+    """Decode JPEG frames in one NVJPEG batch into an RGB [T, C, H, W] uint8 tensor on device"""
+    encoded = [torch.frombuffer(frame_bytes, dtype=torch.uint8) for frame_bytes in frames_jpeg]
+    return torch.stack(decode_jpeg(encoded, mode=ImageReadMode.RGB, device=device))
+
+
+def decode_frames_cv2(frames_jpeg):
+    """Decode JPEG frames on the CPU into a list of BGR [H, W, 3] arrays at native size"""
+    frames = []
+    for i, frame_bytes in enumerate(frames_jpeg):
+        # Decode JPEG bytes to numpy array
+        frame_array = np.frombuffer(frame_bytes, dtype=np.uint8)
+        frame = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
+        
+        if frame is None:
+            raise ValueError(f"Failed to decode frame {i}")
+        
+        # The clip is resized as a batch on the device; only a frame whose
+        # size differs from the rest is resized here so the clip can be stacked
+        if frames and frame.shape != frames[0].shape:
+            frame = cv2.resize(frame, (frames[0].shape[1], frames[0].shape[0]))
+        
+        frames.append(frame)
+    return frames
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -41,6 +91,7 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down service")
+    inference_executor.shutdown(wait=False)
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -52,10 +103,93 @@ async def health():
     )
 
 
+async def offload(func, *args):
+    """Run blocking decode/inference on the inference thread, with bounded queueing"""
+    global pending_requests
+    if pending_requests >= MAX_PENDING_REQUESTS:
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue full. Try again later."
+        )
+    pending_requests += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(inference_executor, func, *args)
+    finally:
+        pending_requests -= 1
+
+
+def decode_base64_frames(frames_b64):
+    """Decode base64 frames to JPEG bytes"""
+    frames_jpeg = []
+    for i, frame_b64 in enumerate(frames_b64):
+        try:
+            frames_jpeg.append(base64.b64decode(frame_b64))
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to decode frame {i}: {str(e)}"
+            )
+    return frames_jpeg
+
+
+def run_inference(frames_jpeg, width, height):
+    """Decode a clip of JPEG frames, run the model and build the response"""
+    # Decode JPEGs and run inference; if NVJPEG fails, retry the clip with cv2
+    use_nvjpeg = NVJPEG_AVAILABLE and str(engine.device).startswith("cuda")
+    if use_nvjpeg:
+        try:
+            video = decode_frames_nvjpeg(frames_jpeg, engine.device)
+        except Exception as e:
+            logger.warning(f"NVJPEG decode failed ({e}), falling back to cv2")
+            use_nvjpeg = False
+    try:
+        if not use_nvjpeg:
+            frames = decode_frames_cv2(frames_jpeg)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to decode frames: {str(e)}"
+        )
+    
+    if use_nvjpeg:
+        predictions_dict = engine.predict_tensor(video, top_k=5, size=(height, width))
+    else:
+        predictions_dict = engine.predict(frames, top_k=5, size=(height, width))
+    
+    # Convert dictionaries to Prediction objects
+    predictions = [Prediction(**pred) for pred in predictions_dict]
+    
+    # Generate clip ID
+    clip_id = str(uuid.uuid4())
+    
+    return PredictionResponse(
+        predictions=predictions,
+        clip_id=clip_id
+    )
+
+
+def split_length_prefixed(body):
+    """Split a body of little-endian uint32 length-prefixed frames into memoryviews"""
+    view = memoryview(body)
+    frames = []
+    offset = 0
+    while offset < len(view):
+        if offset + FRAME_HEADER.size > len(view):
+            raise ValueError(f"Truncated length prefix for frame {len(frames)}")
+        (length,) = FRAME_HEADER.unpack_from(view, offset)
+        offset += FRAME_HEADER.size
+        if offset + length > len(view):
+            raise ValueError(f"Truncated data for frame {len(frames)}")
+        frames.append(view[offset:offset + length])
+        offset += length
+    return frames
+
+
 @app.post("/api/v1/infer", response_model=PredictionResponse)
 async def infer(request: InferenceRequest):
     """
-    Run inference on a video clip
+    Run inference on a video clip (deprecated JSON/base64 path, kept for
+    existing clients; prefer /api/v1/infer/raw)
     
     Args:
         request: InferenceRequest with base64-encoded frames
@@ -71,44 +205,45 @@ async def infer(request: InferenceRequest):
     
     try:
         # Decode frames from base64
-        frames = []
-        for i, frame_b64 in enumerate(request.frames):
-            try:
-                # Decode base64 to bytes
-                frame_bytes = base64.b64decode(frame_b64)
-                
-                # Decode JPEG bytes to numpy array
-                frame_array = np.frombuffer(frame_bytes, dtype=np.uint8)
-                frame = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
-                
-                if frame is None:
-                    raise ValueError(f"Failed to decode frame {i}")
-                
-                # Resize if needed
-                if frame.shape[:2] != (request.height, request.width):
-                    frame = cv2.resize(frame, (request.width, request.height))
-                
-                frames.append(frame)
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Failed to decode frame {i}: {str(e)}"
-                )
-        
-        # Run inference
-        predictions_dict = engine.predict(frames, top_k=5)
+        frames_jpeg = await offload(decode_base64_frames, request.frames)
         
-        # Convert dictionaries to Prediction objects
-        predictions = [Prediction(**pred) for pred in predictions_dict]
-        
-        # Generate clip ID
-        clip_id = str(uuid.uuid4())
+        return await offload(run_inference, frames_jpeg, request.width, request.height)
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Inference error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
+
+
+@app.post("/api/v1/infer/raw", response_model=PredictionResponse)
+async def infer_raw(request: Request, width: int = 240, height: int = 240):
+    """
+    Run inference on a video clip sent as raw JPEG bytes
+    
+    Args:
+        request: application/octet-stream body of JPEG frames, each prefixed
+            with its length as a little-endian uint32
+        width: Frame width the model input is resized to
+        height: Frame height the model input is resized to
         
-        return PredictionResponse(
-            predictions=predictions,
-            clip_id=clip_id
+    Returns:
+        PredictionResponse with top-k predictions
+    """
+    if engine is None or not engine.model_loaded:
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Service may be starting up."
         )
     
+    try:
+        frames_jpeg = split_length_prefixed(await request.body())
+        return await offload(run_inference, frames_jpeg, width, height)
+    
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -124,7 +259,8 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
-            "infer": "/api/v1/infer"
+            "infer": "/api/v1/infer",
+            "infer_raw": "/api/v1/infer/raw"
         },
         "docs": "/docs"
     }